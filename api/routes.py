@@ -3,29 +3,108 @@ The module comprises of the API Endpoints for FastAPI.
 """
 
 import os
-import gradio as gr
+import json
+import asyncio
 from pathlib import Path
-from typing import Annotated
-from fastapi import FastAPI, File, UploadFile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, UploadFile
 from fastapi import HTTPException
-from models.models import QueryRequest, AnswerResponse, UploadResponse
-from middleware.middleware import request_logging_middleware
-from services.retrieval_pipeline import refine_answer
-from services.doc_tools import upload_pdf
-from frontend.gradio_frontend import demo
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from models.models import QueryRequest, BatchQueryRequest, AnswerResponse, JobResponse
+from middleware.middleware import RequestLoggingMiddleware
+from services.retrieval_pipeline import arefine_answer, arefine_answer_stream, arefine_answers_batch, retrieval_flight, refinement_flight, warm_up_gemini
+from services.ingestion_jobs import submit_job, get_job, resume_jobs, stop_jobs
+from core.pipeline_loop import run_async, iterate_async, stop_pipeline_loop
+from core.metrics import render_metrics, start_metrics_flusher, stop_metrics_flusher
+from core.tracing import get_traces
+from core.readiness import register_warm_up, run_all_warm_ups, get_readiness
+from services.vector_store import preload_local_index, vector_backend, warm_up_vector_store, warm_up_embeddings, start_health_checks, stop_health_checks, aclose_vectorstore, get_embeddings
+from services.answer_cache import answer_cache
+from services.question_index import question_index
+from services.lexical_index import lexical_index
+from services.table_description_cache import table_description_cache
 import shutil
 
-app = FastAPI()
-app.middleware("http")(request_logging_middleware)
+
+def preload_shared_state()-> None:
+    """
+    Builds the indexes of the current corpus generation before the server forks its workers so they are shared copy-on-write, each worker rebuilding its copy once ingestion publishes a newer generation
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    question_index.load()
+    lexical_index.load()
+    if(vector_backend == "local"):
+        preload_local_index()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warms up the indexes and shared clients and, unless a "ui" process only queues uploads, runs the ingestion jobs in the background on startup, and stops the vector store health checks and the ingestion workers on shutdown
+
+    Parameters
+    ----------
+    app: FastAPI
+        The FastAPI application
+
+    Returns
+    -------
+    AsyncIterator[None]
+
+    """
+
+
+    register_warm_up("question_index", question_index.load)
+    register_warm_up("lexical_index", lexical_index.load)
+    register_warm_up("vector_store", warm_up_vector_store)
+    register_warm_up("embeddings", warm_up_embeddings)
+    register_warm_up("gemini", warm_up_gemini)
+
+    async def warm_up():
+        await asyncio.to_thread(run_all_warm_ups)
+        start_health_checks()
+
+    start_metrics_flusher()
+    warm_up_task = asyncio.create_task(warm_up())
+    run_jobs = app.state.run_ingestion_jobs
+    if(run_jobs):
+        resume_task = asyncio.create_task(asyncio.to_thread(resume_jobs))
+    yield
+    warm_up_task.cancel()
+    if(run_jobs):
+        resume_task.cancel()
+        stop_jobs()
+    stop_metrics_flusher()
+    stop_health_checks()
+    await run_async(aclose_vectorstore())
+    stop_pipeline_loop()
+
+
+router = APIRouter()
+serve_mode = os.getenv("SERVE_MODE", "full")
+debug_traces_enabled = os.getenv("DEBUG_TRACES", "false").lower() == "true"
+ui_runs_ingestion_jobs = os.getenv("UI_RUNS_INGESTION_JOBS", "false").lower() == "true"
+_app = None
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 500))
 
 
-@app.post("/uploadfile/", response_model=UploadResponse)
+@router.post("/uploadfile/", response_model=JobResponse, status_code=202)
 async def create_upload_file(file: UploadFile):
     """
-    The API endpoint for uploading a file to storage
+    The API endpoint for uploading a file to storage, queueing its ingestion as a background job
 
     Parameters
     ----------
@@ -34,8 +113,8 @@ async def create_upload_file(file: UploadFile):
     
     Returns
     -------
-    UploadResponse
-        The file upload status
+    JobResponse
+        The queued job, whose progress is polled at /jobs/{job_id}
     
     """
     
@@ -50,17 +129,38 @@ async def create_upload_file(file: UploadFile):
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
-    result = upload_pdf(str(file_path))
-    if not result["success"]:
+    job = await asyncio.to_thread(submit_job, str(file_path))
+    return JobResponse(**job)
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_ingestion_job(job_id: str):
+    """
+    The API endpoint for the status of an ingestion job
+
+    Parameters
+    ----------
+    job_id: str
+        The job ID returned by /uploadfile/
+
+    Returns
+    -------
+    JobResponse
+        The job status, the progress of the parse, extract, and embed stages, and the final status code and message
+
+    """
+
+
+    job = await asyncio.to_thread(get_job, job_id)
+    if job is None:
         raise HTTPException(
-            status_code=result["status_code"],
-            detail=result["message"]
+            status_code=404,
+            detail="Job not found."
         )
-    
-    return UploadResponse(message=result["message"])
+    return JobResponse(**job)
 
 
-@app.post("/generateanswer/", response_model=AnswerResponse)
+@router.post("/generateanswer/", response_model=AnswerResponse)
 async def generate_query_answer(request: QueryRequest):
     """
     The API endpoint for answering the user's query
@@ -78,7 +178,7 @@ async def generate_query_answer(request: QueryRequest):
     """
 
 
-    result = refine_answer(request.query)
+    result = await run_async(arefine_answer(request.query))
     if not result["success"]:
         raise HTTPException(
             status_code=result["status_code"],
@@ -88,8 +188,204 @@ async def generate_query_answer(request: QueryRequest):
     return AnswerResponse(answer=result["answer"], source=result["source"])
 
 
-app = gr.mount_gradio_app(
-    app,
-    demo,
-    path="/"
-)
+@router.post("/generateanswer/stream")
+async def stream_query_answer(request: QueryRequest)-> StreamingResponse:
+    """
+    The API endpoint for streaming the answer to the user's query as server-sent events
+
+    Parameters
+    ----------
+    request: QueryRequest
+        The request containing the user's query
+
+    Returns
+    -------
+    StreamingResponse
+        The "source" event after retrieval, "token" events as the answer is generated, and a final "done" or "error" event
+
+    """
+
+
+    async def event_stream():
+        async for event in iterate_async(arefine_answer_stream(request.query)):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/generateanswer/batch")
+async def batch_query_answers(request: BatchQueryRequest)-> StreamingResponse:
+    """
+    The API endpoint for answering many queries in one request
+
+    Parameters
+    ----------
+    request: BatchQueryRequest
+        The request containing the users' queries
+
+    Returns
+    -------
+    StreamingResponse
+        One JSON line per query as it completes, with its index and either the answer and source or the status code and message
+
+    """
+
+
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch can contain at most {BATCH_MAX_QUERIES} queries."
+        )
+
+    async def result_stream():
+        async for result in iterate_async(arefine_answers_batch(request.queries)):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/cachestats/")
+async def get_cache_stats()-> dict:
+    """
+    The API endpoint for the cache and request coalescing counters
+
+    Returns
+    -------
+    dict
+        The hit, miss, and eviction counters of the caches
+
+    """
+
+
+    return {
+        "query_embeddings": get_embeddings().stats(),
+        "refined_answers": answer_cache.stats(),
+        "coalesced_retrievals": retrieval_flight.stats(),
+        "coalesced_refinements": refinement_flight.stats(),
+        "table_descriptions": table_description_cache.stats() if table_description_cache is not None else None
+    }
+
+
+@router.get("/ready")
+async def get_ready()-> JSONResponse:
+    """
+    The API endpoint for the readiness of the replica
+
+    Returns
+    -------
+    JSONResponse
+        The readiness and warm-up latency of every dependency, with status 503 until all of them are ready
+
+    """
+
+
+    readiness = get_readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
+
+@router.get("/metrics")
+async def get_metrics()-> PlainTextResponse:
+    """
+    The API endpoint for the stage and request latency metrics of every worker process on the host in the Prometheus text format
+
+    Returns
+    -------
+    PlainTextResponse
+        The histograms and counters
+
+    """
+
+
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def get_debug_traces(limit: int = 50, trace_id: str | None = None)-> dict:
+    """
+    The API endpoint for the most recent request traces of this worker process, registered only when DEBUG_TRACES is true
+
+    Parameters
+    ----------
+    limit: int
+        The maximum number of traces
+
+    trace_id: str | None
+        The X-Request-ID of the request to be shown
+
+    Returns
+    -------
+    dict
+        The traces with their nested spans, newest first
+
+    """
+
+
+    return {"traces": get_traces(limit, trace_id)}
+
+
+def create_app(mode: str | None = None)-> FastAPI:
+    """
+    Builds the FastAPI application for a serving mode, importing Gradio only when the UI is served
+
+    Parameters
+    ----------
+    mode: str | None
+        "full" serves the API and the Gradio UI, "api" serves only the API, and "ui" serves only the Gradio UI. Defaults to SERVE_MODE
+
+    Returns
+    -------
+    FastAPI
+        The application
+
+    """
+
+
+    mode = mode or serve_mode
+    app = FastAPI(lifespan=lifespan)
+    #A separate "ui" process only queues uploads, so it does not compete with the API workers for jobs and the local index files
+    app.state.run_ingestion_jobs = mode != "ui" or ui_runs_ingestion_jobs
+    app.add_middleware(RequestLoggingMiddleware)
+    if(mode != "ui"):
+        app.include_router(router)
+        #The traces hold the queries and span attributes of recent requests, so they are only served when explicitly enabled
+        if(debug_traces_enabled):
+            app.add_api_route("/debug/traces", get_debug_traces, methods=["GET"])
+    else:
+        app.add_api_route("/ready", get_ready, methods=["GET"])
+    if(mode != "api"):
+        import gradio as gr
+        from frontend.gradio_frontend import demo
+        app = gr.mount_gradio_app(
+            app,
+            demo,
+            path="/"
+        )
+    return app
+
+
+def __getattr__(name: str):
+    """
+    Builds the application of the configured serving mode on first access of api.routes.app
+
+    Parameters
+    ----------
+    name: str
+        The attribute name
+
+    Returns
+    -------
+    FastAPI
+        The application
+
+    """
+
+
+    global _app
+    if(name == "app"):
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
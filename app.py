@@ -3,16 +3,72 @@ The module contains the application's entry point
 """
 
 import os
+import gc
+import argparse
 import uvicorn
 from core.logging_config import setup_logging
+from core.metrics import reset_shared_metrics
 
 setup_logging()
 
+
+def run_production_server(workers: int)-> None:
+    """
+    Runs the application with Gunicorn and Uvicorn workers, preloading a snapshot of the indexes in the master process before it forks
+
+    Parameters
+    ----------
+    workers: int
+        The number of worker processes
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    from gunicorn.app.base import BaseApplication
+
+    class ProductionServer(BaseApplication):
+
+        def load_config(self):
+            options = {
+                "bind": f"0.0.0.0:{int(os.getenv('PORT', 8000))}",
+                "workers": workers,
+                "worker_class": "uvicorn_worker.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": int(os.getenv("GRACEFUL_TIMEOUT", 30)),
+                "timeout": int(os.getenv("WORKER_TIMEOUT", 120)),
+                "keepalive": int(os.getenv("KEEPALIVE", 5))
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from api.routes import create_app, preload_shared_state
+
+            preload_shared_state()
+            app = create_app()
+            gc.freeze()
+            return app
+
+    ProductionServer().run()
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "api.routes:app",
-        host="0.0.0.0",
-        port=int(os.getenv("PORT", 8000)),
-        reload=True
-    )
-    
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Runs the FAQ QA Chatbot")
+    parser.add_argument("--dev", action="store_true", help="Run a single Uvicorn process that reloads on code changes")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)), help="The number of worker processes in production mode")
+    args = parser.parse_args()
+    reset_shared_metrics()
+
+    if args.dev:
+        uvicorn.run(
+            "api.routes:app",
+            host="0.0.0.0",
+            port=int(os.getenv("PORT", 8000)),
+            reload=True
+        )
+    else:
+        run_production_server(args.workers)
@@ -0,0 +1,162 @@
+"""
+The module comprises of the bounded in-memory cache used by the retrieval pipeline.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A thread-safe least-recently-used cache with an optional time to live and hit, miss, and eviction counters
+
+    """
+
+
+    def __init__(self, max_entries: int, ttl: float | None = None):
+        """
+        Creates the cache
+
+        Parameters
+        ----------
+        max_entries: int
+            The maximum number of entries held in memory
+
+        ttl: float | None
+            The number of seconds an entry stays valid, or None for no expiry
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        """
+        Returns the cached value for the key
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        Returns
+        -------
+        Any
+            The cached value, or None if the key is missing or expired
+
+        """
+
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value)-> None:
+        """
+        Stores the value and evicts the least recently used entries beyond max_entries
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        value: Any
+            The value to be cached
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str)-> None:
+        """
+        Removes the key from the cache
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self)-> None:
+        """
+        Removes every entry from the cache
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self)-> dict:
+        """
+        Returns the cache counters
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The size, hits, misses, and evictions of the cache
+
+        """
+
+
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
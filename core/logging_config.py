@@ -2,8 +2,25 @@
 The module configures application logging.
 """
 
+import os
+import json
+import queue
+import atexit
+import random
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from core.request_context import fetch_request_id
+from core.metrics import Counter
+
+log_mode = os.getenv("LOG_MODE", "queue")
+log_format = os.getenv("LOG_FORMAT", "text")
+log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+log_sample_rate = float(os.getenv("LOG_SAMPLE_RATE", 1.0))
+log_sampling_threshold = float(os.getenv("LOG_SAMPLING_THRESHOLD", 0.5))
+log_records_dropped = Counter("faq_log_records_dropped_total", "Log records dropped because the log queue was full or the record was sampled out", ("reason",))
+_listener = None
+_queue_handler = None
+_handler = None
 
 
 class RequestIDFilter(logging.Filter):
@@ -12,7 +29,7 @@ class RequestIDFilter(logging.Filter):
 
     """
 
-    
+
     def filter(self, record)-> bool:
         """
         Adds the Request ID in the context variable
@@ -33,6 +50,169 @@ class RequestIDFilter(logging.Filter):
         return True
 
 
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each log record as one JSON object per line
+
+    """
+
+
+    def format(self, record)-> str:
+        """
+        Formats the record with its time, level, logger, RequestID, message, and exception
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            The log record
+
+        Returns
+        -------
+        str
+            The JSON line
+
+        """
+
+
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hands log records to the listener thread without blocking, sampling INFO records when the queue fills up and counting dropped records
+
+    """
+
+
+    def __init__(self, log_queue: queue.Queue, sample_rate: float, sampling_threshold: float):
+        """
+        Creates the handler
+
+        Parameters
+        ----------
+        log_queue: queue.Queue
+            The bounded queue read by the listener thread
+
+        sample_rate: float
+            The share of INFO records kept while the queue is above the sampling threshold
+
+        sampling_threshold: float
+            The share of the queue capacity above which INFO records are sampled
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        super().__init__(log_queue)
+        self.sample_rate = sample_rate
+        self.sampling_threshold = sampling_threshold
+
+    def prepare(self, record: logging.LogRecord)-> logging.LogRecord:
+        """
+        Resolves the message arguments in the calling thread and leaves formatting to the listener thread
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            The log record
+
+        Returns
+        -------
+        logging.LogRecord
+            The record to be queued
+
+        """
+
+
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record: logging.LogRecord)-> None:
+        """
+        Queues the record unless it is sampled out or the queue is full
+
+        Parameters
+        ----------
+        record: logging.LogRecord
+            The log record
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        log_queue = self.queue
+        if record.levelno <= logging.INFO and self.sample_rate < 1.0 and log_queue.maxsize > 0:
+            if log_queue.qsize() > self.sampling_threshold * log_queue.maxsize and random.random() >= self.sample_rate:
+                log_records_dropped.inc("sampled")
+                return
+        try:
+            log_queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            log_records_dropped.inc("full")
+        except Exception:
+            self.handleError(record)
+
+
+def _start_listener()-> None:
+    """
+    Starts the listener thread that formats and writes the queued records, with a new queue so a forked worker never shares one with its parent
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _listener
+    if _queue_handler is None:
+        return
+    _queue_handler.queue = queue.Queue(maxsize=log_queue_size)
+    _listener = QueueListener(_queue_handler.queue, _handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging()-> None:
+    """
+    Writes the queued records and stops the listener thread
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _listener
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+    _listener = None
+
+
 def setup_logging()-> None:
     """
     Configures application logging
@@ -47,11 +227,30 @@ def setup_logging()-> None:
     """
 
 
-    formatter = logging.Formatter("%(asctime)s | %(levelname)s | RequestID=%(request_id)s | %(message)s")
+    global _queue_handler, _handler
+    stop_logging()
+    _queue_handler = None
+    if log_format == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s | %(levelname)s | RequestID=%(request_id)s | %(message)s")
     handler = logging.StreamHandler()
     handler.setFormatter(formatter)
-    handler.addFilter(RequestIDFilter())
     root_logger = logging.getLogger()
     root_logger.handlers.clear()
-    root_logger.addHandler(handler)
     root_logger.setLevel(logging.INFO)
+
+    if log_mode != "queue":
+        handler.addFilter(RequestIDFilter())
+        root_logger.addHandler(handler)
+        return
+
+    _handler = handler
+    _queue_handler = BoundedQueueHandler(queue.Queue(maxsize=log_queue_size), log_sample_rate, log_sampling_threshold)
+    _queue_handler.addFilter(RequestIDFilter())
+    root_logger.addHandler(_queue_handler)
+    _start_listener()
+
+
+os.register_at_fork(after_in_child=_start_listener)
+atexit.register(stop_logging)
@@ -0,0 +1,709 @@
+"""
+The module comprises of the latency histograms and counters exported in the Prometheus text format, aggregated across the worker processes of the host.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import sqlite3
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from core.tracing import span
+
+logger = logging.getLogger("faq-qa-bot")
+default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+metrics_path = os.getenv("METRICS_PATH", "./cache/metrics.sqlite3")
+metrics_flush_interval = float(os.getenv("METRICS_FLUSH_INTERVAL", 5.0))
+_registry = []
+
+
+def _format_labels(labelnames: tuple, labelvalues: tuple, extra: str = "")-> str:
+    """
+    Formats label names and values as a Prometheus label set
+
+    Parameters
+    ----------
+    labelnames: tuple
+        The label names
+
+    labelvalues: tuple
+        The label values
+
+    extra: str
+        An additional formatted label such as le="0.5"
+
+    Returns
+    -------
+    str
+        The label set, or an empty string when there are no labels
+
+    """
+
+
+    pairs = [f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    A monotonically increasing counter with labels
+
+    """
+
+
+    def __init__(self, name: str, description: str, labelnames: tuple = ()):
+        """
+        Creates the counter and registers it for export
+
+        Parameters
+        ----------
+        name: str
+            The metric name
+
+        description: str
+            The help text
+
+        labelnames: tuple
+            The label names
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *labelvalues, amount: float = 1.0)-> None:
+        """
+        Increments the counter
+
+        Parameters
+        ----------
+        labelvalues: tuple
+            The label values in the order of the label names
+
+        amount: float
+            The increment
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def snapshot(self)-> dict:
+        """
+        Returns a copy of the values of this process
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The value of every label set
+
+        """
+
+
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self)-> None:
+        """
+        Clears the values, e.g. the values a forked worker inherited from its parent
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            self._values = {}
+
+    @staticmethod
+    def merge(total, value):
+        """
+        Adds the value of another process to the total of a label set
+
+        Parameters
+        ----------
+        total: float | None
+            The total so far
+
+        value: float
+            The value of a process
+
+        Returns
+        -------
+        float
+            The new total
+
+        """
+
+
+        return (total or 0.0) + value
+
+    def render(self, values: dict | None = None)-> list:
+        """
+        Returns the exposition lines of the counter
+
+        Parameters
+        ----------
+        values: dict | None
+            The values of every label set. Defaults to the values of this process
+
+        Returns
+        -------
+        list
+            The HELP, TYPE, and sample lines
+
+        """
+
+
+        values = self.snapshot() if values is None else values
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    A cumulative bucket histogram with labels
+
+    """
+
+
+    def __init__(self, name: str, description: str, labelnames: tuple = (), buckets: tuple = default_buckets):
+        """
+        Creates the histogram and registers it for export
+
+        Parameters
+        ----------
+        name: str
+            The metric name
+
+        description: str
+            The help text
+
+        labelnames: tuple
+            The label names
+
+        buckets: tuple
+            The ascending upper bounds of the buckets in seconds
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labelvalues)-> None:
+        """
+        Records an observation
+
+        Parameters
+        ----------
+        value: float
+            The observed value
+
+        labelvalues: tuple
+            The label values in the order of the label names
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self)-> dict:
+        """
+        Returns a copy of the series of this process
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The bucket counts, sum, and count of every label set
+
+        """
+
+
+        with self._lock:
+            return {labelvalues: (list(series[0]), series[1], series[2]) for labelvalues, series in self._values.items()}
+
+    def reset(self)-> None:
+        """
+        Clears the series, e.g. the series a forked worker inherited from its parent
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            self._values = {}
+
+    @staticmethod
+    def merge(total, value):
+        """
+        Adds the series of another process to the total of a label set
+
+        Parameters
+        ----------
+        total: tuple | None
+            The bucket counts, sum, and count so far
+
+        value: tuple
+            The bucket counts, sum, and count of a process
+
+        Returns
+        -------
+        tuple
+            The new total
+
+        """
+
+
+        if total is None:
+            return (list(value[0]), value[1], value[2])
+        return ([a + b for a, b in zip(total[0], value[0])], total[1] + value[1], total[2] + value[2])
+
+    def render(self, values: dict | None = None)-> list:
+        """
+        Returns the exposition lines of the histogram
+
+        Parameters
+        ----------
+        values: dict | None
+            The bucket counts, sum, and count of every label set. Defaults to the series of this process
+
+        Returns
+        -------
+        list
+            The HELP, TYPE, bucket, sum, and count lines
+
+        """
+
+
+        values = self.snapshot() if values is None else values
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labelvalues, (bucket_counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labelvalues, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labelvalues)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+stage_duration = Histogram("faq_stage_duration_seconds", "Latency of each pipeline stage", ("stage",))
+stage_errors = Counter("faq_stage_errors_total", "Failures of each pipeline stage", ("stage",))
+request_duration = Histogram("faq_http_request_duration_seconds", "Latency of HTTP requests until the response body is sent", ("method", "path", "status"))
+requests_total = Counter("faq_http_requests_total", "HTTP requests", ("method", "path", "status"))
+
+
+def observe_stage(stage: str, seconds: float, error: bool = False)-> None:
+    """
+    Records the latency of a stage that was timed by the caller
+
+    Parameters
+    ----------
+    stage: str
+        The stage name, e.g. "embedding", "vector_search", "llm_refinement", "upstage_parse", "table_description", or "catalog_io"
+
+    seconds: float
+        The latency of the stage
+
+    error: bool
+        Whether the stage failed
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    stage_duration.observe(seconds, stage)
+    if error:
+        stage_errors.inc(stage)
+
+
+@contextmanager
+def stage_timer(stage: str, **attributes):
+    """
+    Times the enclosed block as a stage and traces it as a span, counting an error when it raises
+
+    Parameters
+    ----------
+    stage: str
+        The stage name
+
+    attributes: dict
+        The initial attributes of the span
+
+    Returns
+    -------
+    Iterator[Span | None]
+        The span of the stage, or None when tracing is disabled
+
+    """
+
+
+    stage_start = time.perf_counter()
+    with span(stage, **attributes) as stage_span:
+        try:
+            yield stage_span
+        except Exception:
+            observe_stage(stage, time.perf_counter() - stage_start, error=True)
+            raise
+    observe_stage(stage, time.perf_counter() - stage_start)
+
+
+class MetricsStore:
+    """
+    The metric values of every worker process on the host in a SQLite file, so any worker can export the totals
+
+    """
+
+
+    def __init__(self, path: str):
+        """
+        Creates the store without opening the database, so it can be created before the server forks
+
+        Parameters
+        ----------
+        path: str
+            The path of the SQLite file shared by the processes
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.path = path
+        self.instance_id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    def _connect(self)-> sqlite3.Connection:
+        """
+        Returns the connection of the current process, opening it on first use and after a fork
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        sqlite3.Connection
+            The connection in WAL mode
+
+        """
+
+
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS metric_values (instance TEXT NOT NULL, name TEXT NOT NULL, labels TEXT NOT NULL, "
+            "value TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (instance, name, labels))"
+        )
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+    def flush(self)-> None:
+        """
+        Writes the values of this process under its instance ID
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        now = time.time()
+        rows = [
+            (self.instance_id, metric.name, json.dumps(labelvalues, default=str), json.dumps(value), now)
+            for metric in _registry
+            for labelvalues, value in metric.snapshot().items()
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany("INSERT OR REPLACE INTO metric_values (instance, name, labels, value, updated_at) VALUES (?, ?, ?, ?, ?)", rows)
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error:
+            logger.exception("Metrics flush failed")
+
+    def totals(self)-> dict:
+        """
+        Returns the values of every process that ever flushed, summed by metric and label set
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The summed values by metric name and label values
+
+        """
+
+
+        metrics = {metric.name: metric for metric in _registry}
+        totals = {name: {} for name in metrics}
+        with self._lock:
+            rows = self._connect().execute("SELECT name, labels, value FROM metric_values").fetchall()
+        for name, labels, value in rows:
+            metric = metrics.get(name)
+            if metric is None:
+                continue
+            labelvalues = tuple(json.loads(labels))
+            totals[name][labelvalues] = metric.merge(totals[name].get(labelvalues), json.loads(value))
+        return totals
+
+    def clear(self)-> None:
+        """
+        Deletes the values of previous runs, called once by the process that starts the server
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        try:
+            with self._lock:
+                self._connect().execute("DELETE FROM metric_values")
+        except sqlite3.Error:
+            logger.exception("Metrics reset failed")
+
+
+metrics_store = MetricsStore(metrics_path) if metrics_path else None
+_flusher = None
+_flusher_stop = threading.Event()
+
+
+def _flush_periodically()-> None:
+    """
+    Flushes the values of this process until the flusher is stopped
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    while not _flusher_stop.wait(metrics_flush_interval):
+        metrics_store.flush()
+
+
+def start_metrics_flusher()-> None:
+    """
+    Starts the thread writing the values of this worker process to the shared metrics file
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _flusher
+    if metrics_store is None or (_flusher is not None and _flusher.is_alive()):
+        return
+    _flusher_stop.clear()
+    _flusher = threading.Thread(target=_flush_periodically, name="metrics-flusher", daemon=True)
+    _flusher.start()
+
+
+def stop_metrics_flusher()-> None:
+    """
+    Stops the flusher thread and writes the final values of this process
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _flusher
+    _flusher_stop.set()
+    _flusher = None
+    if metrics_store is not None:
+        metrics_store.flush()
+
+
+def reset_shared_metrics()-> None:
+    """
+    Clears the shared metrics file before the server starts its workers
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    if metrics_store is not None:
+        metrics_store.clear()
+
+
+def _after_fork_in_child()-> None:
+    """
+    Gives a forked worker its own instance ID and clears the values it inherited, so they are not counted twice
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _flusher
+    for metric in _registry:
+        metric.reset()
+    _flusher = None
+    if metrics_store is not None:
+        metrics_store.instance_id = uuid.uuid4().hex
+
+
+def render_metrics()-> str:
+    """
+    Returns every registered metric in the Prometheus text exposition format
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    str
+        The totals of every worker process on the host, or of the current process when METRICS_PATH is empty
+
+    """
+
+
+    totals = {}
+    if metrics_store is not None:
+        metrics_store.flush()
+        try:
+            totals = metrics_store.totals()
+        except sqlite3.Error:
+            logger.exception("Metrics aggregation failed, exporting the values of this process")
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(totals.get(metric.name)))
+    return "\n".join(lines) + "\n"
+
+
+if metrics_store is not None:
+    os.register_at_fork(before=metrics_store.flush, after_in_child=_after_fork_in_child)
+    atexit.register(stop_metrics_flusher)
@@ -0,0 +1,29 @@
+"""
+The module comprises of the text normalization used to build cache and index keys for user queries.
+"""
+
+import re
+
+_whitespace_pattern = re.compile(r"\s+")
+_trailing_punctuation = "?!.,;:"
+
+
+def normalize_query(text: str)-> str:
+    """
+    Normalizes a query so that repeats differing only in case, whitespace, or trailing punctuation share one key
+
+    Parameters
+    ----------
+    text: str
+        The query sent by the user
+
+    Returns
+    -------
+    str
+        The normalized query
+
+    """
+
+
+    text = _whitespace_pattern.sub(" ", text).strip().lower()
+    return text.rstrip(_trailing_punctuation).rstrip()
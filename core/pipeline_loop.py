@@ -0,0 +1,233 @@
+"""
+The module manages the background event loop on which the asynchronous query pipeline and its async clients run.
+"""
+
+import os
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import Future
+
+_loop_lock = threading.Lock()
+_loop = None
+_loop_thread = None
+_loop_pid = None
+
+
+def get_pipeline_loop()-> asyncio.AbstractEventLoop:
+    """
+    Returns the process-wide pipeline event loop, starting its thread on first use or after a fork
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    asyncio.AbstractEventLoop
+        The running pipeline event loop
+
+    """
+
+
+    global _loop, _loop_thread, _loop_pid
+    if _loop is not None and _loop_pid == os.getpid() and _loop_thread.is_alive():
+        return _loop
+
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid() or not _loop_thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="pipeline-loop", daemon=True)
+            _loop_thread.start()
+            _loop_pid = os.getpid()
+    return _loop
+
+
+def submit(coro)-> Future:
+    """
+    Schedules a coroutine on the pipeline loop, carrying over the caller's context variables
+
+    Parameters
+    ----------
+    coro: Coroutine
+        The coroutine to be run
+
+    Returns
+    -------
+    Future
+        The future of the coroutine result
+
+    """
+
+
+    return asyncio.run_coroutine_threadsafe(coro, get_pipeline_loop())
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine on the pipeline loop and blocks the calling thread until it completes
+
+    Parameters
+    ----------
+    coro: Coroutine
+        The coroutine to be run
+
+    Returns
+    -------
+    Any
+        The coroutine result
+
+    """
+
+
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync cannot be called from the pipeline loop. Await the coroutine instead.")
+    return submit(coro).result()
+
+
+async def run_async(coro):
+    """
+    Runs a coroutine on the pipeline loop and awaits it from another event loop without blocking it
+
+    Parameters
+    ----------
+    coro: Coroutine
+        The coroutine to be run
+
+    Returns
+    -------
+    Any
+        The coroutine result
+
+    """
+
+
+    if asyncio.get_running_loop() is _loop:
+        return await coro
+    return await asyncio.wrap_future(submit(coro))
+
+
+async def _anext(agen):
+    """
+    Awaits the next item of an async generator
+
+    Parameters
+    ----------
+    agen: AsyncGenerator
+        The async generator
+
+    Returns
+    -------
+    Any
+        The next item
+
+    """
+
+
+    return await agen.__anext__()
+
+
+async def _aclose(agen)-> None:
+    """
+    Closes an async generator
+
+    Parameters
+    ----------
+    agen: AsyncGenerator
+        The async generator
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    await agen.aclose()
+
+
+async def iterate_async(agen):
+    """
+    Iterates an async generator on the pipeline loop from another event loop
+
+    Parameters
+    ----------
+    agen: AsyncGenerator
+        The async generator created by the pipeline
+
+    Returns
+    -------
+    AsyncIterator
+        The items of the generator
+
+    """
+
+
+    try:
+        while True:
+            try:
+                item = await run_async(_anext(agen))
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await run_async(_aclose(agen))
+
+
+def iterate_sync(agen):
+    """
+    Iterates an async generator on the pipeline loop from synchronous code, keeping the caller's context variables for every step
+
+    Parameters
+    ----------
+    agen: AsyncGenerator
+        The async generator created by the pipeline
+
+    Returns
+    -------
+    Iterator
+        The items of the generator
+
+    """
+
+
+    context = contextvars.copy_context()
+
+    def iterate():
+        try:
+            while True:
+                try:
+                    item = context.run(run_sync, _anext(agen))
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            context.run(run_sync, _aclose(agen))
+
+    return iterate()
+
+
+def stop_pipeline_loop()-> None:
+    """
+    Stops the pipeline loop and waits for its thread to exit
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            return
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop_thread.join(timeout=5)
+        _loop = None
+        _loop_thread = None
@@ -0,0 +1,143 @@
+"""
+The module comprises of the registry of startup warm-up hooks and the readiness of every dependency they prepare.
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger("faq-qa-bot")
+_lock = threading.Lock()
+_hooks = {}
+_status = {}
+
+
+def register_warm_up(name: str, hook: callable)-> None:
+    """
+    Registers the warm-up hook of a dependency
+
+    Parameters
+    ----------
+    name: str
+        The dependency name reported by the readiness endpoint
+
+    hook: callable
+        Creates the dependency and opens its connections. Returns False or raises when the dependency is not usable
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    with _lock:
+        _hooks[name] = hook
+        _status.setdefault(name, {"ready": False, "warm_up_time": None, "error": None, "last_warm_up": None})
+
+
+def run_warm_up(name: str)-> bool:
+    """
+    Runs the warm-up hook of a dependency and records its readiness and latency
+
+    Parameters
+    ----------
+    name: str
+        The dependency name
+
+    Returns
+    -------
+    bool
+        The readiness of the dependency
+
+    """
+
+
+    warm_up_start = time.perf_counter()
+    error = None
+    try:
+        ready = _hooks[name]() is not False
+    except Exception as e:
+        logger.exception("Warm-up failed | Dependency = %s", name)
+        ready = False
+        error = str(e)
+    warm_up_time = time.perf_counter() - warm_up_start
+    with _lock:
+        if not ready and error is None:
+            error = _status[name]["error"]
+        _status[name] = {"ready": ready, "warm_up_time": round(warm_up_time, 3), "error": error, "last_warm_up": time.time()}
+    logger.info("Warm-up completed | Dependency = %s | Ready = %s | Time = %.3fs", name, ready, warm_up_time)
+    return ready
+
+
+def run_all_warm_ups()-> bool:
+    """
+    Runs every registered warm-up hook in registration order
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        True when every dependency is ready
+
+    """
+
+
+    warm_up_start = time.perf_counter()
+    results = [run_warm_up(name) for name in list(_hooks)]
+    logger.info("Startup warm-up completed | Ready = %s | Time = %.3fs", all(results), time.perf_counter() - warm_up_start)
+    return all(results)
+
+
+def set_ready(name: str, ready: bool, error: str | None = None)-> None:
+    """
+    Updates the readiness of a dependency outside of its warm-up, e.g. from a health check
+
+    Parameters
+    ----------
+    name: str
+        The dependency name
+
+    ready: bool
+        The readiness of the dependency
+
+    error: str | None
+        The last error of the dependency
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    with _lock:
+        if name in _status:
+            _status[name] = dict(_status[name], ready=ready, error=error)
+
+
+def get_readiness()-> dict:
+    """
+    Returns the readiness of every registered dependency
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    dict
+        The overall readiness and the readiness, warm-up latency, and last error of each dependency
+
+    """
+
+
+    with _lock:
+        dependencies = {name: dict(status) for name, status in _status.items()}
+    return {
+        "ready": bool(dependencies) and all(status["ready"] for status in dependencies.values()),
+        "dependencies": dependencies
+    }
@@ -0,0 +1,306 @@
+"""
+The module comprises of the file-backed cache tier shared by every worker process on the host.
+"""
+
+import os
+import time
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger("faq-qa-bot")
+shared_cache_path = os.getenv("SHARED_CACHE_PATH", "./cache/shared_cache.sqlite3")
+
+
+class SharedCache:
+    """
+    A size-bounded SQLite cache in WAL mode with a time to live and invalidation by tag, safe to use from several processes
+
+    """
+
+
+    def __init__(self, path: str, namespace: str, max_entries: int, ttl: float | None = None, evict_interval: int = 64, invalidation_poll_interval: float = 1.0):
+        """
+        Creates the cache without opening the database, so it can be created before the server forks
+
+        Parameters
+        ----------
+        path: str
+            The path of the SQLite file shared by the processes
+
+        namespace: str
+            The name separating this cache from the other caches in the file
+
+        max_entries: int
+            The maximum number of entries kept in the namespace
+
+        ttl: float | None
+            The number of seconds an entry stays valid, or None for no expiry
+
+        evict_interval: int
+            The number of writes of this process between two eviction passes
+
+        invalidation_poll_interval: float
+            The number of seconds the tag invalidation times are cached in this process
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evict_interval = evict_interval
+        self.invalidation_poll_interval = invalidation_poll_interval
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._writes = 0
+        self._invalidations = {}
+        self._invalidations_loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _connect(self)-> sqlite3.Connection:
+        """
+        Returns the connection of the current process, opening it on first use and after a fork
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        sqlite3.Connection
+            The connection in WAL mode
+
+        """
+
+
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache (namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, tag TEXT, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS shared_cache_tag ON shared_cache (namespace, tag)")
+        connection.execute("CREATE INDEX IF NOT EXISTS shared_cache_accessed ON shared_cache (namespace, accessed_at)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS shared_cache_invalidations (namespace TEXT NOT NULL, tag TEXT NOT NULL, "
+            "invalidated_at REAL NOT NULL, PRIMARY KEY (namespace, tag))"
+        )
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+    def get(self, key: str)-> dict | None:
+        """
+        Returns the cached entry for the key
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        Returns
+        -------
+        dict | None
+            The value, tag, and creation time, or None if the key is missing, expired, or the database is unavailable
+
+        """
+
+
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, tag, created_at, accessed_at FROM shared_cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                now = time.time()
+                if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                    connection.execute("DELETE FROM shared_cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                    row = None
+                if row is not None and now - row[3] > 60:
+                    connection.execute("UPDATE shared_cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key))
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Shared cache read failed | Namespace = %s", self.namespace)
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"value": row[0], "tag": row[1], "created_at": row[2]}
+
+    def set(self, key: str, value: bytes | str, tag: str | None = None, created_at: float | None = None)-> None:
+        """
+        Stores the value and periodically evicts expired and least recently used entries beyond max_entries
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        value: bytes | str
+            The value to be cached
+
+        tag: str | None
+            The tag the entry can be invalidated by, e.g. the file name of the source document
+
+        created_at: float | None
+            The creation time of the value. Defaults to now
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO shared_cache (namespace, key, value, tag, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, value, tag, created_at or now, now)
+                )
+                self._writes += 1
+                if self._writes % self.evict_interval == 0:
+                    self._evict(connection, now)
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Shared cache write failed | Namespace = %s", self.namespace)
+
+    def _evict(self, connection: sqlite3.Connection, now: float)-> None:
+        """
+        Deletes the expired entries and the least recently used entries beyond max_entries
+
+        Parameters
+        ----------
+        connection: sqlite3.Connection
+            The connection of the current process
+
+        now: float
+            The current time
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        if self.ttl is not None:
+            connection.execute("DELETE FROM shared_cache WHERE namespace = ? AND created_at < ?", (self.namespace, now - self.ttl))
+        connection.execute(
+            "DELETE FROM shared_cache WHERE namespace = ? AND key IN (SELECT key FROM shared_cache WHERE namespace = ? "
+            "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def invalidate_tag(self, tag: str)-> int:
+        """
+        Deletes every entry with the tag and records the invalidation so other processes drop their in-memory copies
+
+        Parameters
+        ----------
+        tag: str
+            The tag, e.g. the file name of a re-ingested document
+
+        Returns
+        -------
+        int
+            The number of deleted entries
+
+        """
+
+
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                deleted = connection.execute("DELETE FROM shared_cache WHERE namespace = ? AND tag = ?", (self.namespace, tag)).rowcount
+                connection.execute(
+                    "INSERT OR REPLACE INTO shared_cache_invalidations (namespace, tag, invalidated_at) VALUES (?, ?, ?)",
+                    (self.namespace, tag, now)
+                )
+                self._invalidations[tag] = now
+            return deleted
+        except sqlite3.Error:
+            self.errors += 1
+            logger.exception("Shared cache invalidation failed | Namespace = %s", self.namespace)
+            return 0
+
+    def invalidated_at(self, tag: str)-> float | None:
+        """
+        Returns the time at which the tag was last invalidated by any process, polling the database at most once per interval
+
+        Parameters
+        ----------
+        tag: str
+            The tag
+
+        Returns
+        -------
+        float | None
+            The invalidation time, or None if the tag was never invalidated
+
+        """
+
+
+        now = time.monotonic()
+        if now - self._invalidations_loaded_at > self.invalidation_poll_interval:
+            try:
+                with self._lock:
+                    rows = self._connect().execute(
+                        "SELECT tag, invalidated_at FROM shared_cache_invalidations WHERE namespace = ?", (self.namespace,)
+                    ).fetchall()
+                self._invalidations = dict(rows)
+            except sqlite3.Error:
+                self.errors += 1
+                logger.exception("Shared cache invalidation poll failed | Namespace = %s", self.namespace)
+            self._invalidations_loaded_at = now
+        return self._invalidations.get(tag)
+
+    def stats(self)-> dict:
+        """
+        Returns the cache counters
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The size, hits, misses, and errors of the cache in this process
+
+        """
+
+
+        try:
+            with self._lock:
+                size = self._connect().execute("SELECT COUNT(*) FROM shared_cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
@@ -0,0 +1,189 @@
+"""
+The module comprises of the single-flight group that coalesces identical in-flight upstream calls.
+"""
+
+import asyncio
+from core.tracing import set_attribute
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call per key between all concurrent callers on the pipeline loop
+
+    """
+
+
+    def __init__(self, timeout: float | None = None):
+        """
+        Creates the group
+
+        Parameters
+        ----------
+        timeout: float | None
+            The number of seconds each caller waits for the shared call, or None to wait indefinitely
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.timeout = timeout
+        self._calls = {}
+        self._streams = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def _forget(self, key: str, future: asyncio.Future)-> None:
+        """
+        Removes the finished call so the next caller starts a new one
+
+        Parameters
+        ----------
+        key: str
+            The call key
+
+        future: asyncio.Future
+            The finished call
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        if self._calls.get(key) is future:
+            del self._calls[key]
+            self._streams.pop(key, None)
+        if not future.cancelled():
+            future.exception()
+
+    async def do(self, key: str, call: callable):
+        """
+        Awaits the in-flight call for the key, starting it if there is none
+
+        Parameters
+        ----------
+        key: str
+            The call key
+
+        call: callable
+            Returns the coroutine that performs the upstream call
+
+        Returns
+        -------
+        Any
+            The result of the shared call. Its exception is raised to every caller, and asyncio.TimeoutError to a caller that waits longer than the timeout
+
+        """
+
+
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda finished: self._forget(key, finished))
+            self.calls += 1
+            set_attribute("coalesced", False)
+        else:
+            self.coalesced += 1
+            set_attribute("coalesced", True)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def stream(self, key: str, call: callable):
+        """
+        Streams the chunks of the in-flight streamed call for the key, starting it if there is none, so every concurrent caller receives the chunks of one upstream call
+
+        Parameters
+        ----------
+        key: str
+            The call key
+
+        call: callable
+            Returns the async iterator that performs the upstream streamed call
+
+        Returns
+        -------
+        AsyncIterator[str]
+            The chunks sent so far followed by the new ones. A caller joining an in-flight call of do receives its whole result as one chunk
+
+        """
+
+
+        future = self._calls.get(key)
+        if future is None:
+            buffer = {"chunks": [], "changed": asyncio.Event()}
+
+            async def produce():
+                try:
+                    async for chunk in call():
+                        buffer["chunks"].append(chunk)
+                        changed, buffer["changed"] = buffer["changed"], asyncio.Event()
+                        changed.set()
+                    return "".join(buffer["chunks"])
+                finally:
+                    buffer["changed"].set()
+
+            #Running the upstream call in its own task so the other callers keep streaming when the first one disconnects
+            future = asyncio.ensure_future(produce())
+            self._calls[key] = future
+            self._streams[key] = buffer
+            future.add_done_callback(lambda finished: self._forget(key, finished))
+            self.calls += 1
+            set_attribute("coalesced", False)
+        else:
+            self.coalesced += 1
+            set_attribute("coalesced", True)
+
+        buffer = self._streams.get(key) if self._calls.get(key) is future else None
+        try:
+            if buffer is None:
+                result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+                if result:
+                    yield result
+                return
+            position = 0
+            while True:
+                while position < len(buffer["chunks"]):
+                    position += 1
+                    yield buffer["chunks"][position - 1]
+                if future.done():
+                    future.result()
+                    if position == len(buffer["chunks"]):
+                        return
+                    continue
+                await asyncio.wait_for(buffer["changed"].wait(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def stats(self)-> dict:
+        """
+        Returns the group counters
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The number of started calls, coalesced callers, timeouts, and calls in flight
+
+        """
+
+
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "in_flight": len(self._calls)
+        }
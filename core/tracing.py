@@ -0,0 +1,344 @@
+"""
+The module comprises of the request-scoped tracing spans kept in an in-memory ring buffer and optionally exported as JSON lines.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from core.request_context import fetch_request_id
+
+logger = logging.getLogger("faq-qa-bot")
+tracing_enabled = os.getenv("TRACING", "true").lower() == "true"
+trace_buffer_size = int(os.getenv("TRACE_BUFFER_SIZE", 200))
+trace_export_path = os.getenv("TRACE_EXPORT_PATH") or None
+current_span_context: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_traces = deque(maxlen=trace_buffer_size)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    """
+    The spans of one request, exported once every span has finished
+
+    """
+
+
+    def __init__(self, trace_id: str):
+        """
+        Creates an empty trace
+
+        Parameters
+        ----------
+        trace_id: str
+            The request ID the trace belongs to
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.trace_id = trace_id
+        self.spans = []
+        self.open_spans = 0
+        self.exported = False
+        self._lock = threading.Lock()
+
+
+class Span:
+    """
+    A timed operation with attributes, nested under the span that was current when it started
+
+    """
+
+
+    def __init__(self, name: str, parent=None, attributes: dict | None = None):
+        """
+        Starts the span
+
+        Parameters
+        ----------
+        name: str
+            The operation name
+
+        parent: Span | None
+            The enclosing span, or None for a root span
+
+        attributes: dict | None
+            The initial attributes
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        if parent is not None and not parent.trace.exported:
+            self.trace = parent.trace
+        else:
+            self.trace = Trace(parent.trace.trace_id if parent is not None else fetch_request_id())
+        with self.trace._lock:
+            self.trace.open_spans += 1
+
+    def set_attribute(self, key: str, value)-> None:
+        """
+        Sets an attribute of the span
+
+        Parameters
+        ----------
+        key: str
+            The attribute name
+
+        value: Any
+            The JSON serializable attribute value
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.attributes[key] = value
+
+    def finish(self, error: str | None = None)-> None:
+        """
+        Ends the span and exports its trace when it was the last open span
+
+        Parameters
+        ----------
+        error: str | None
+            The error that ended the span
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.duration = time.perf_counter() - self._start
+        self.error = error
+        with self.trace._lock:
+            self.trace.spans.append(self)
+            self.trace.open_spans -= 1
+            finished = self.trace.open_spans == 0
+            if finished:
+                self.trace.exported = True
+        if finished:
+            _export(self.trace)
+
+    def to_dict(self)-> dict:
+        """
+        Returns the span as a JSON serializable dictionary
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The span identifiers, timing, attributes, and error
+
+        """
+
+
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+def _export(trace: Trace)-> None:
+    """
+    Adds the finished trace to the ring buffer and appends it to the export file
+
+    Parameters
+    ----------
+    trace: Trace
+        The finished trace
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    spans = sorted(trace.spans, key=lambda span: span.start_time)
+    record = {
+        "trace_id": trace.trace_id,
+        "start": spans[0].start_time,
+        "duration_ms": round((max(span.start_time + span.duration for span in spans) - spans[0].start_time) * 1000, 3),
+        "spans": [span.to_dict() for span in spans]
+    }
+    _traces.append(record)
+    if trace_export_path is not None:
+        try:
+            with _export_lock, open(trace_export_path, "a", encoding="utf-8") as export_file:
+                export_file.write(json.dumps(record, default=str) + "\n")
+        except OSError:
+            logger.exception("Trace export failed")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Runs the enclosed block as a span nested under the current span
+
+    Parameters
+    ----------
+    name: str
+        The operation name
+
+    attributes: dict
+        The initial attributes, e.g. k or the retrieval mode
+
+    Returns
+    -------
+    Iterator[Span | None]
+        The span, or None when tracing is disabled
+
+    """
+
+
+    if not tracing_enabled:
+        yield None
+        return
+    current = Span(name, current_span_context.get(), attributes)
+    token = current_span_context.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current_span_context.reset(token)
+        current.finish(error=f"{type(e).__name__}: {e}")
+        raise
+    current_span_context.reset(token)
+    current.finish()
+
+
+def record_span(name: str, start_time: float, duration: float, error: str | None = None, **attributes)-> None:
+    """
+    Records an already timed operation as a finished span under the current span, for code that cannot hold a span open such as async generators
+
+    Parameters
+    ----------
+    name: str
+        The operation name
+
+    start_time: float
+        The time.time value at which the operation started
+
+    duration: float
+        The duration of the operation in seconds
+
+    error: str | None
+        The error that ended the operation
+
+    attributes: dict
+        The attributes of the span
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    if not tracing_enabled:
+        return
+    recorded = Span(name, current_span_context.get(), attributes)
+    recorded.start_time = start_time
+    recorded._start = time.perf_counter() - duration
+    recorded.finish(error=error)
+
+
+def set_attribute(key: str, value)-> None:
+    """
+    Sets an attribute of the current span, if there is one
+
+    Parameters
+    ----------
+    key: str
+        The attribute name
+
+    value: Any
+        The JSON serializable attribute value
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    current = current_span_context.get()
+    if current is not None:
+        current.set_attribute(key, value)
+
+
+def bind_context(function: callable)-> callable:
+    """
+    Binds a function to the caller's context variables so spans it opens in a thread pool or background task stay in the caller's trace
+
+    Parameters
+    ----------
+    function: callable
+        The function to be run elsewhere
+
+    Returns
+    -------
+    callable
+        The function running in a copy of the caller's context
+
+    """
+
+
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(function, *args, **kwargs)
+
+
+def get_traces(limit: int = 50, trace_id: str | None = None)-> list:
+    """
+    Returns the most recent finished traces, newest first
+
+    Parameters
+    ----------
+    limit: int
+        The maximum number of traces
+
+    trace_id: str | None
+        Returns only the traces of this request ID
+
+    Returns
+    -------
+    list
+        The traces with their spans
+
+    """
+
+
+    traces = [trace for trace in reversed(_traces) if trace_id is None or trace["trace_id"] == trace_id]
+    return traces[:limit]
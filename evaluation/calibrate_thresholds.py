@@ -0,0 +1,203 @@
+"""
+The module comprises of the offline calibration of the similarity score gate from the extracted question-answer pairs
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import argparse
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(root_dir)
+os.chdir(root_dir)
+from services.qa_catalog import load_qa_entries
+from services.retrieval_pipeline import dense_search, score_gate_key
+from services.score_gate import score_thresholds_path
+from services.vector_store import warm_up
+
+off_topic_questions = [
+    "What is the weather forecast for tomorrow?",
+    "Who won the football world cup in 2018?",
+    "How do I bake a chocolate cake?",
+    "What is the capital of Australia?",
+    "Recommend a good movie to watch tonight.",
+    "How many calories are in a banana?",
+    "What time does the supermarket close?",
+    "Translate good morning into French.",
+    "How do I change a flat tyre?",
+    "What is the best programming language for games?",
+    "Tell me a joke.",
+    "Who painted the Mona Lisa?",
+    "How far is the moon from the earth?",
+    "What are the symptoms of the flu?",
+    "How do I reset my phone to factory settings?"
+]
+
+
+def load_negative_questions(negatives_path: str | None)-> list:
+    """
+    Loads the questions that the FAQ documents cannot answer
+
+    Parameters
+    ----------
+    negatives_path: str | None
+        The path of a CSV file with a "question" column, used in addition to the built-in off-topic questions
+
+    Returns
+    -------
+    list
+        The unanswerable questions
+
+    """
+
+
+    questions = list(off_topic_questions)
+    if negatives_path:
+        with open(negatives_path, mode="r", newline="", encoding="utf-8") as negatives_file:
+            questions.extend(row["question"] for row in csv.DictReader(negatives_file) if row.get("question"))
+    return questions
+
+
+def score_questions(questions: list)-> list:
+    """
+    Retrieves the two most similar question-answer pairs for every question
+
+    Parameters
+    ----------
+    questions: list
+        The questions to be scored
+
+    Returns
+    -------
+    list
+        The retrieved documents of every question, or None where retrieval failed
+
+    """
+
+
+    results = []
+    for question in questions:
+        docs = dense_search(question, k=2)
+        results.append(docs if isinstance(docs, list) else None)
+    return results
+
+
+def lower_quantile(values: list, recall: float)-> float:
+    """
+    Returns the largest value that keeps the requested share of the values at or above it
+
+    Parameters
+    ----------
+    values: list
+        The scores
+
+    recall: float
+        The share of the values to be kept
+
+    Returns
+    -------
+    float
+        The threshold
+
+    """
+
+
+    ranked = sorted(values, reverse=True)
+    return ranked[max(math.ceil(recall * len(ranked)), 1) - 1]
+
+
+def calibrate(recall: float, with_margin: bool, negatives_path: str | None)-> dict:
+    """
+    Picks the thresholds that keep the target share of the stored questions answerable while rejecting as many unanswerable questions as possible
+
+    Parameters
+    ----------
+    recall: float
+        The share of the stored questions that must pass the gate
+
+    with_margin: bool
+        Whether to also calibrate the top-2 margin check
+
+    negatives_path: str | None
+        The path of a CSV file of additional unanswerable questions
+
+    Returns
+    -------
+    dict
+        The calibrated min_score and min_margin
+
+    """
+
+
+    entries = load_qa_entries()
+    negatives = load_negative_questions(negatives_path)
+    positive_results = score_questions([entry["question"] for entry in entries])
+    negative_results = score_questions(negatives)
+
+    positive_scores = []
+    positive_margins = []
+    for entry, docs in zip(entries, positive_results):
+        if docs and docs[0]["content"] == entry["content"]:
+            positive_scores.append(docs[0]["similarity_score"])
+            if len(docs) > 1:
+                positive_margins.append(docs[0]["similarity_score"] - docs[1]["similarity_score"])
+    negative_scores = [docs[0]["similarity_score"] for docs in negative_results if docs]
+    if not positive_scores:
+        raise SystemExit("No stored question was retrieved correctly. Check the vector store before calibrating.")
+
+    min_score = lower_quantile(positive_scores, recall)
+    if negative_scores and max(negative_scores) < min_score:
+        min_score = (max(negative_scores) + min_score) / 2
+    min_margin = lower_quantile(positive_margins, recall) if with_margin and positive_margins else None
+
+    kept = sum(score >= min_score for score in positive_scores) / len(positive_scores)
+    rejected = sum(score < min_score for score in negative_scores) / len(negative_scores) if negative_scores else 0.0
+    print(f"Index: {score_gate_key}")
+    print(f"Stored questions retrieved correctly: {len(positive_scores)}/{len(entries)}")
+    print(f"Answerable scores: min={min(positive_scores):.4f} max={max(positive_scores):.4f}")
+    if negative_scores:
+        print(f"Unanswerable scores: min={min(negative_scores):.4f} max={max(negative_scores):.4f}")
+    print(f"min_score={min_score:.4f} | Answerable kept = {kept:.2%} | Unanswerable rejected = {rejected:.2%}")
+    if min_margin is not None:
+        print(f"min_margin={min_margin:.4f}")
+    return {"min_score": round(min_score, 4), "min_margin": round(min_margin, 4) if min_margin is not None else None}
+
+
+def save_thresholds(thresholds: dict)-> None:
+    """
+    Writes the calibrated thresholds of the configured index, keeping the thresholds of other indexes
+
+    Parameters
+    ----------
+    thresholds: dict
+        The calibrated min_score and min_margin
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    saved = {}
+    if os.path.exists(score_thresholds_path):
+        with open(score_thresholds_path, "r", encoding="utf-8") as thresholds_file:
+            saved = json.load(thresholds_file)
+    saved[score_gate_key] = thresholds
+    with open(score_thresholds_path, "w", encoding="utf-8") as thresholds_file:
+        json.dump(saved, thresholds_file, indent=4)
+    print(f"Thresholds written to {score_thresholds_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrates the similarity score gate of the configured vector index")
+    parser.add_argument("--recall", type=float, default=0.98, help="The share of the stored questions that must pass the gate")
+    parser.add_argument("--with-margin", action="store_true", help="Also calibrate the top-2 margin check")
+    parser.add_argument("--negatives", help="A CSV file with a question column of additional unanswerable questions")
+    parser.add_argument("--dry-run", action="store_true", help="Print the thresholds without writing them")
+    args = parser.parse_args()
+    warm_up()
+    thresholds = calibrate(args.recall, args.with_margin, args.negatives)
+    if not args.dry_run:
+        save_thresholds(thresholds)
@@ -13,6 +13,7 @@ from deepeval.models import GPTModel
 from deepeval.test_case import LLMTestCase, SingleTurnParams, LLMTestCaseParams
 from deepeval.metrics import ContextualRecallMetric
 from services.retrieval_pipeline import retrieve_similar_docs 
+from services.vector_store import warm_up
 
 _ = load_dotenv(find_dotenv())
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -98,5 +99,6 @@ def contextual_recall_eval()-> float:
 
 
 if __name__ == "__main__":
+    warm_up()
     score = contextual_recall_eval()
     print("Score: ", score)
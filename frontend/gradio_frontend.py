@@ -3,13 +3,15 @@ The file comprises of the User Interface for the FAQ QA Chatbot.
 """
 
 import os
+import time
 import logging
 import gradio as gr
 from core.request_context import start_request_context, end_request_context
-from services.doc_tools import upload_pdf
-from services.retrieval_pipeline import refine_answer
+from services.ingestion_jobs import submit_job, get_job
+from services.retrieval_pipeline import refine_answer_stream
 
 logger = logging.getLogger("faq-qa-bot")
+job_poll_interval = float(os.getenv("GRADIO_JOB_POLL_INTERVAL", 1.0))
 
 
 def ask_query(query):
@@ -17,29 +19,41 @@ def ask_query(query):
     
     token = start_request_context()
     try:
-        result = refine_answer(query)
-        if result["success"]:
-            return (result["answer"], gr.update(value=result["source"]), gr.update(visible=True))
-
-        return (result["message"], gr.update(value=""), gr.update(visible=False))
+        events = refine_answer_stream(query)
     finally:
         end_request_context(token)
 
+    answer = ""
+    for event in events:
+        if event["event"] == "source":
+            yield ("", gr.update(value=event["data"]["source"]), gr.update(visible=True))
+        elif event["event"] == "token":
+            answer += event["data"]["text"]
+            yield (answer, gr.update(), gr.update())
+        elif event["event"] == "error":
+            yield (event["data"]["message"], gr.update(value=""), gr.update(visible=False))
+
 
 def process_pdf(file_path):
 
     
+    if file_path is None: #Aug9th
+        logger.warning("No file uploaded")
+        yield "No file uploaded." #Aug9th
+        return
+
     token = start_request_context() #Aug9th
     try: #Aug9th
-        if file_path is None: #Aug9th
-            logger.warning("No file uploaded")
-            return "No file uploaded." #Aug9th
-
-        result = upload_pdf(file_path) #Aug9th
-        return result["message"] #Aug9th
+        job = submit_job(file_path)
     finally: #Aug9th
         end_request_context(token) #Aug9th
 
+    while job["status"] in ("queued", "running"):
+        yield f"Processing PDF: {job['stage'] or job['status']}"
+        time.sleep(job_poll_interval)
+        job = get_job(job["job_id"])
+    yield job["message"]
+
 
 with gr.Blocks(theme=gr.themes.Glass(primary_hue="slate")) as demo:
     
@@ -1,50 +1,100 @@
 """
-The module comprises of the HTTP middleware for request logging.
+The module comprises of the ASGI middleware for request logging.
 """
 
 import time
-import uuid
 import logging
-from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Receive, Scope, Send, Message
 from core.request_context import start_request_context, end_request_context, fetch_request_id
+from core.metrics import request_duration, requests_total
+from core.tracing import span, set_attribute
 
 logger = logging.getLogger("faq-qa-bot")
 
 
-async def request_logging_middleware(request: Request, call_next: callable)-> Response:
+class RequestLoggingMiddleware:
     """
-    Generates a RequestID and logs every HTTP request and response
+    Generates a RequestID and logs, times, and traces every HTTP request without wrapping the response stream
 
-    Parameters
-    ----------
-    request: Request
-        The HTTP request
-    
-    call_next: Callable
-        The next endpoint handler in the request processing pipeline
+    """
 
-    Returns
-    -------
-    Response
-        The HTTP Response
 
-    """
+    def __init__(self, app: ASGIApp):
+        """
+        Wraps the ASGI application
+
+        Parameters
+        ----------
+        app: ASGIApp
+            The next application in the middleware stack
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send)-> None:
+        """
+        Handles an ASGI connection, adding the X-Request-ID header to HTTP responses and logging them once they are complete
+
+        Parameters
+        ----------
+        scope: Scope
+            The connection scope
+
+        receive: Receive
+            The channel of incoming messages
+
+        send: Send
+            The channel of outgoing messages
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_request_context()
+        request_id = fetch_request_id()
+        scope.setdefault("state", {})["request_id"] = request_id
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message: Message)-> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
 
-    
-    token = start_request_context()
-    request.state.request_id = fetch_request_id()
-    start_time = time.perf_counter()
-    response = await call_next(request)
-    time_elapsed = time.perf_counter() - start_time
-    response.headers["X-Request-ID"] = fetch_request_id()
-    client_ip = (request.client.host if request.client is not None else "Unknown")
-    logger.info(
-        "Client=%s | %s %s | Status=%d | Time=%.3fs",
-        client_ip,
-        request.method,
-        request.url.path,
-        response.status_code,
-        time_elapsed
-    )
-    end_request_context(token)
-    return response
+        try:
+            with span("http_request", method=scope["method"], path=scope["path"]):
+                try:
+                    await self.app(scope, receive, send_with_request_id)
+                finally:
+                    set_attribute("status", status_code)
+        finally:
+            time_elapsed = time.perf_counter() - start_time
+            client_ip = (scope["client"][0] if scope.get("client") else "Unknown")
+            route_path = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_duration.observe(time_elapsed, scope["method"], route_path, status_code)
+            requests_total.inc(scope["method"], route_path, status_code)
+            logger.info(
+                "Client=%s | %s %s | Status=%d | Time=%.3fs",
+                client_ip,
+                scope["method"],
+                scope["path"],
+                status_code,
+                time_elapsed
+            )
+            end_request_context(token)
@@ -7,10 +7,21 @@ from pydantic import BaseModel
 class QueryRequest(BaseModel):
     query: str
 
+class BatchQueryRequest(BaseModel):
+    queries: list[str]
+
 class AnswerResponse(BaseModel):
     answer: str
     source: str
 
-class UploadResponse(BaseModel):
-    message: str
+class JobResponse(BaseModel):
+    job_id: str
+    file_name: str
+    status: str
+    stage: str | None
+    stages: dict[str, str]
+    status_code: int | None
+    message: str | None
+    created_at: float
+    updated_at: float
     
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+The module comprises of the refined answer cache keyed by the retrieved question-answer pair and the prompt version.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.cache import LRUCache
+from core.shared_cache import SharedCache, shared_cache_path
+from core.tracing import span, bind_context
+
+logger = logging.getLogger("faq-qa-bot")
+answer_cache_max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 5000))
+answer_cache_ttl = float(os.getenv("ANSWER_CACHE_TTL", 86400))
+answer_cache_stale_ttl = float(os.getenv("ANSWER_CACHE_STALE_TTL", 604800))
+answer_cache_refresh_workers = int(os.getenv("ANSWER_CACHE_REFRESH_WORKERS", 2))
+answer_shared_cache_max_entries = int(os.getenv("ANSWER_SHARED_CACHE_MAX_ENTRIES", 50000))
+
+
+def answer_cache_key(doc: dict, prompt_version: str)-> str:
+    """
+    Builds the cache key from the content of the retrieved question-answer pair and the prompt version
+
+    Parameters
+    ----------
+    doc: dict
+        The retrieved document
+
+    prompt_version: str
+        The version of the refinement prompt
+
+    Returns
+    -------
+    str
+        The SHA-256 content hash
+
+    """
+
+
+    key_source = f"{prompt_version}\n{doc['file_name']}\n{doc['page_number']}\n{doc['content']}"
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+class RefinedAnswerCache:
+    """
+    Caches refined answers, serving stale entries while refreshing them in the background
+
+    """
+
+
+    def __init__(self, max_entries: int, ttl: float, stale_ttl: float, refresh_workers: int, shared_cache: SharedCache | None = None):
+        """
+        Creates the cache
+
+        Parameters
+        ----------
+        max_entries: int
+            The maximum number of answers held in memory
+
+        ttl: float
+            The number of seconds an answer is served as fresh
+
+        stale_ttl: float
+            The number of seconds after ttl during which a stale answer is served while it is refreshed
+
+        refresh_workers: int
+            The number of background refresh threads
+
+        shared_cache: SharedCache | None
+            The optional cache tier shared with the other processes on the host
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = LRUCache(max_entries=max_entries)
+        self.shared_cache = shared_cache
+        self._keys_by_file = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="answer-refresh")
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    def get(self, key: str)-> dict | None:
+        """
+        Returns the cached answer and whether it is stale
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        Returns
+        -------
+        dict | None
+            The answer and its staleness, or None if it is missing or past the stale window
+
+        """
+
+
+        entry = self._entries.get(key)
+        if entry is not None and self.shared_cache is not None:
+            invalidated_at = self.shared_cache.invalidated_at(entry["file_name"])
+            if invalidated_at is not None and entry["created_at"] <= invalidated_at:
+                self._entries.delete(key)
+                entry = None
+        if entry is None and self.shared_cache is not None:
+            shared_entry = self.shared_cache.get(key)
+            if shared_entry is not None:
+                entry = {"answer": shared_entry["value"], "file_name": shared_entry["tag"], "created_at": shared_entry["created_at"]}
+                self._remember(key, entry)
+        if entry is None:
+            return None
+        age = time.time() - entry["created_at"]
+        if age > self.ttl + self.stale_ttl:
+            self._entries.delete(key)
+            return None
+        stale = age > self.ttl
+        if stale:
+            self.stale_hits += 1
+        return {"answer": entry["answer"], "stale": stale}
+
+    def set(self, key: str, answer: str, file_name: str)-> None:
+        """
+        Stores the refined answer
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        answer: str
+            The refined answer
+
+        file_name: str
+            The document the answer belongs to
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        entry = {"answer": answer, "file_name": file_name, "created_at": time.time()}
+        self._remember(key, entry)
+        if self.shared_cache is not None:
+            self.shared_cache.set(key, answer, tag=file_name, created_at=entry["created_at"])
+
+    def _remember(self, key: str, entry: dict)-> None:
+        """
+        Stores the entry in memory and indexes its key by document
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        entry: dict
+            The answer, its document, and its creation time
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self._entries.set(key, entry)
+        with self._lock:
+            self._keys_by_file.setdefault(entry["file_name"], set()).add(key)
+
+    def refresh(self, key: str, file_name: str, generate: callable)-> None:
+        """
+        Regenerates a stale answer in the background unless a refresh is already running for the key
+
+        Parameters
+        ----------
+        key: str
+            The cache key
+
+        file_name: str
+            The document the answer belongs to
+
+        generate: callable
+            Returns the regenerated answer
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run_refresh():
+            try:
+                with span("answer_refresh", file_name=file_name):
+                    answer = generate()
+                if answer:
+                    self.set(key, answer, file_name)
+                    self.refreshes += 1
+            except Exception:
+                logger.exception("Background answer refresh failed")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(bind_context(run_refresh))
+
+    def invalidate_file(self, file_name: str)-> None:
+        """
+        Removes every cached answer of a document from memory and from the shared cache of every process
+
+        Parameters
+        ----------
+        file_name: str
+            The document that was re-ingested
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        with self._lock:
+            keys = self._keys_by_file.pop(file_name, set())
+        for key in keys:
+            self._entries.delete(key)
+        if self.shared_cache is not None:
+            self.shared_cache.invalidate_tag(file_name)
+        self.invalidations += 1
+        logger.info("Refined answer cache invalidated | File = %s | Entries = %d", file_name, len(keys))
+
+    def stats(self)-> dict:
+        """
+        Returns the cache counters
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The memory cache counters along with stale hits, refreshes, invalidations, and the shared cache counters
+
+        """
+
+
+        cache_stats = self._entries.stats()
+        cache_stats["stale_hits"] = self.stale_hits
+        cache_stats["refreshes"] = self.refreshes
+        cache_stats["invalidations"] = self.invalidations
+        cache_stats["shared"] = self.shared_cache.stats() if self.shared_cache is not None else None
+        return cache_stats
+
+
+answer_cache = RefinedAnswerCache(
+    max_entries=answer_cache_max_entries,
+    ttl=answer_cache_ttl,
+    stale_ttl=answer_cache_stale_ttl,
+    refresh_workers=answer_cache_refresh_workers,
+    shared_cache=SharedCache(shared_cache_path, "refined_answers", answer_shared_cache_max_entries, ttl=answer_cache_ttl + answer_cache_stale_ttl) if shared_cache_path else None
+    )
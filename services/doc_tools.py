@@ -5,32 +5,58 @@ The module comprises of the tools to upload, parse, and store embeddings of PDFs
 import os
 import logging
 import time 
-import pandas as pd
 import json
-import csv
 import re
 import requests
 import shutil
-import base64
-import langchain
 from langchain_openai import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
 from pinecone.exceptions import PineconeException, PineconeApiException
 from openai import OpenAIError, APIStatusError
-from langchain.messages import SystemMessage, HumanMessage
+from langchain.messages import HumanMessage
 from dotenv import load_dotenv, find_dotenv
+from core.metrics import stage_timer, stage_errors
+from services.vector_store import get_vectorstore
+from services.ingestion_catalog import ingestion_catalog, compute_content_hash
+from services.answer_cache import answer_cache
+from services.question_index import question_index
+from services.lexical_index import lexical_index
+from services.retrieval_pipeline import get_gemini_llm, system_message_content
+from services.table_description_cache import table_description_key, get_cached_description, set_cached_description
 
 _ = load_dotenv(find_dotenv())
 openai_api_key = os.getenv("OPENAI_API_KEY")
 upstage_api_key = os.getenv("UPSTAGE_API_KEY")
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-index_name = "faqsampleindexjuly2026"
+ingest_refinement = os.getenv("INGEST_REFINEMENT", "false").lower() == "true"
+ingest_refinement_batch_size = int(os.getenv("INGEST_REFINEMENT_BATCH_SIZE", 16))
+ingest_refinement_concurrency = int(os.getenv("INGEST_REFINEMENT_CONCURRENCY", 4))
+table_description_concurrency = int(os.getenv("TABLE_DESCRIPTION_CONCURRENCY", 4))
+table_description_attempts = int(os.getenv("TABLE_DESCRIPTION_ATTEMPTS", 3))
+table_description_model = "gpt-4.1"
+table_description_prompt = "Your task is to provide an explanation of the specific information in the table. The explanation must be of moderate length, written in neat and tidy English, and include the specific details. The explanation must not start with (The table .. or This table ..) and there must be no special characters."
 logger = logging.getLogger("faq-qa-bot")
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=openai_api_key)
-llm = ChatOpenAI(model = "gpt-4.1", temperature = 0)
-df = pd.read_csv("./pdf_log.csv")
+_llm = None
+
+
+def get_llm()-> ChatOpenAI:
+    """
+    Returns the OpenAI client used for table descriptions, creating it on first use
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    ChatOpenAI
+        The shared GPT-4.1 client
+
+    """
+
+
+    global _llm
+    if _llm is None:
+        _llm = ChatOpenAI(model = table_description_model, temperature = 0)
+    return _llm
 
 
 def ends_with_digit(text: str)-> bool:
@@ -174,28 +200,28 @@ def clean_subheadings(text: str)-> str:
     return text
 
 
-def get_table_description(text: str)-> str:
+def table_description_message(text: str)-> HumanMessage:
     """
-    Extracts table descriptions from the parsed PDF using GPT-4o
+    Builds the GPT-4.1 request describing a table image
 
     Parameters
-    ---------
+    ----------
     text: str
-        The extracted table text from the parsed PDF
+        The base64 encoded table image from the parsed PDF
 
     Returns
     -------
-    response.content: str
-        The table description
+    HumanMessage
+        The prompt with the table image
 
     """
 
-    
-    message = HumanMessage(
+
+    return HumanMessage(
     content_blocks=[
         {
             "type": "text", 
-            "text": "Your task is to provide an explanation of the specific information in the table. The explanation must be of moderate length, written in neat and tidy English, and include the specific details. The explanation must not start with (The table .. or This table ..) and there must be no special characters."
+            "text": table_description_prompt
         },
         {
             "type": "image",
@@ -205,19 +231,126 @@ def get_table_description(text: str)-> str:
     ]
     )
 
+
+def get_table_description(text: str)-> str:
+    """
+    Extracts table descriptions from the parsed PDF using GPT-4o
+
+    Parameters
+    ---------
+    text: str
+        The extracted table text from the parsed PDF
+
+    Returns
+    -------
+    response.content: str
+        The table description
+
+    """
+
+    
+    cache_key = table_description_key(text, table_description_prompt, table_description_model)
+    cached_description = get_cached_description(cache_key)
+    if(cached_description is not None):
+        return cached_description
+
+    message = table_description_message(text)
     summary_gen_start_time = time.perf_counter() 
     logger.info("Starting OpenAI summary generation") 
     try:
-        response = llm.invoke([message])
+        with stage_timer("table_description"):
+            response = get_llm().invoke([message])
         elapsed_time = time.perf_counter() - summary_gen_start_time 
         logger.info("Table summary generated successfully | Time = %.3fs", elapsed_time)
+        set_cached_description(cache_key, response.content)
         return response.content
-    except Exception as e:
+    except Exception:
         elapsed_time = time.perf_counter() - summary_gen_start_time 
         logger.exception("Open AI summary generation failed | Time = %.3fs", elapsed_time) 
         return None
 
 
+def get_table_descriptions(texts: list)-> list:
+    """
+    Describes the table images concurrently with bounded parallelism, retrying each failed request and reusing the cached descriptions of identical images
+
+    Parameters
+    ----------
+    texts: list
+        The base64 encoded table images in document order
+
+    Returns
+    -------
+    list
+        The table descriptions in the order of the images, with None where every attempt failed
+
+    """
+
+
+    descriptions = {}
+    cache_keys = {}
+    for text in dict.fromkeys(texts):
+        cache_keys[text] = table_description_key(text, table_description_prompt, table_description_model)
+        cached_description = get_cached_description(cache_keys[text])
+        if(cached_description is not None):
+            descriptions[text] = cached_description
+    uncached_texts = [text for text in cache_keys if text not in descriptions]
+    if(len(uncached_texts) == 0):
+        return [descriptions[text] for text in texts]
+    summary_gen_start_time = time.perf_counter()
+    logger.info("Starting OpenAI summary generation | Tables = %d | Cached = %d", len(uncached_texts), len(descriptions))
+    llm = get_llm().with_retry(stop_after_attempt=table_description_attempts)
+    with stage_timer("table_description", tables=len(uncached_texts)):
+        responses = llm.batch([[table_description_message(text)] for text in uncached_texts], config={"max_concurrency": table_description_concurrency}, return_exceptions=True)
+    for text, response in zip(uncached_texts, responses):
+        if isinstance(response, Exception):
+            stage_errors.inc("table_description")
+            logger.error("Open AI summary generation failed for a table | Error = %s", response)
+            descriptions[text] = None
+        else:
+            descriptions[text] = response.content
+            set_cached_description(cache_keys[text], response.content)
+    elapsed_time = time.perf_counter() - summary_gen_start_time
+    logger.info("Table summaries generated | Generated = %d | Time = %.3fs", sum(1 for text in uncached_texts if descriptions[text] is not None), elapsed_time)
+    return [descriptions[text] for text in texts]
+
+
+def refine_questions_answers(questions_answers: dict)-> list:
+    """
+    Refines every extracted answer once at ingestion using Gemini in bounded parallel batches
+
+    Parameters
+    ----------
+    questions_answers: dict
+        The extracted questions answers
+
+    Returns
+    -------
+    list
+        The refined answers in the order of the questions, with an empty string where refinement failed
+
+    """
+
+
+    pairs = [f"{q}\n{a}" for q, a in zip(questions_answers["questions"], questions_answers["answers"])]
+    refined_answers = []
+    refinement_start_time = time.perf_counter()
+    logger.info("Starting ingestion answer refinement | Pairs = %d", len(pairs))
+    for batch_start in range(0, len(pairs), ingest_refinement_batch_size):
+        batch = pairs[batch_start:batch_start + ingest_refinement_batch_size]
+        messages = [[("system", system_message_content), ("human", pair)] for pair in batch]
+        responses = get_gemini_llm().batch(messages, config={"max_concurrency": ingest_refinement_concurrency}, return_exceptions=True)
+        for response in responses:
+            if isinstance(response, Exception):
+                logger.error("Gemini refinement failed for a question-answer pair | Error = %s", response)
+                refined_answers.append("")
+            else:
+                refined_answers.append(response.text if response.content else "")
+    elapsed_time = time.perf_counter() - refinement_start_time
+    logger.info("Ingestion answer refinement completed | Refined = %d | Time = %.3fs", sum(1 for answer in refined_answers if answer), elapsed_time)
+    return refined_answers
+
+
 def extract_headings_and_tableofcontents(file_path: str)-> dict:
     """
     Extracts headings, subheadings, and table of contents from the parsed PDF
@@ -274,6 +407,52 @@ def extract_headings_and_tableofcontents(file_path: str)-> dict:
         return file_contents
 
 
+def table_placeholder(position: int)-> str:
+    """
+    Returns the marker holding the place of a table description in an answer until the tables are described
+
+    Parameters
+    ----------
+    position: int
+        The position of the table image in the document
+
+    Returns
+    -------
+    str
+        The marker
+
+    """
+
+
+    return f"\x00table:{position}\x00"
+
+
+def insert_table_descriptions(answer: str, table_descriptions: list)-> str:
+    """
+    Replaces the table markers of an extracted answer with the table descriptions, stripping it as if the descriptions had been inserted during extraction
+
+    Parameters
+    ----------
+    answer: str
+        The extracted answer starting with "Answer: "
+
+    table_descriptions: list
+        The table descriptions in document order
+
+    Returns
+    -------
+    str
+        The answer with the table descriptions
+
+    """
+
+
+    if("\x00table:" not in answer):
+        return answer
+    text = re.sub(r"\x00table:(\d+)\x00", lambda match: table_descriptions[int(match.group(1))], answer[len("Answer: "):])
+    return "Answer: " + text.strip()
+
+
 def extract_questions_answers(file_path: str)-> dict:
     """
     Extracts questions and answers from the parsed PDF
@@ -291,6 +470,7 @@ def extract_questions_answers(file_path: str)-> dict:
     """
 
     
+    import pandas as pd
     questions_answers = {"questions": [],
                          "answers": [],
                          "page_number": []
@@ -299,6 +479,7 @@ def extract_questions_answers(file_path: str)-> dict:
     questions_started = False
     questions_ended = False
     answer = ""   
+    table_images = []
     file_contents = extract_headings_and_tableofcontents(file_path)
     with open(file_path, 'r') as file:
         file_parsed_data = json.loads(file.read())
@@ -341,11 +522,9 @@ def extract_questions_answers(file_path: str)-> dict:
                     if((element["content"]["text"] not in file_contents["subheadings"] and element["content"]["text"].upper() not in file_contents["subheadings"]) and questions_started == True):
                         element_keys = element.keys()
                         if("base64_encoding" in element_keys):
-                            table_description = get_table_description(element["base64_encoding"])
-                            if(table_description == None):
-                                return "There was an error in the Open AI API. Unable to extract questions and answers from the PDF."
-                            else:
-                                answer = answer + "\n" + table_description + "\n"
+                            #Describing the tables concurrently once the answers are assembled
+                            answer = answer + "\n" + table_placeholder(len(table_images)) + "\n"
+                            table_images.append(element["base64_encoding"])
                         elif(element["category"] == "list"):
                             final_bullet_points = []
                             index = 0
@@ -407,19 +586,51 @@ def extract_questions_answers(file_path: str)-> dict:
                         answer = ""
                         break
 
+    if(len(table_images) > 0):
+        table_descriptions = get_table_descriptions(table_images)
+        if(None in table_descriptions):
+            return "There was an error in the Open AI API. Unable to extract questions and answers from the PDF."
+        questions_answers["answers"] = [insert_table_descriptions(answer, table_descriptions) for answer in questions_answers["answers"]]
+
+    if(ingest_refinement == True):
+        questions_answers["refined_answers"] = refine_questions_answers(questions_answers)
+
     #Creating CSV file of question-answer pairs for record
     name_of_file = os.path.basename(file_path)
     csv_file_name = name_of_file.replace(".json", ".csv")
     csv_file_path = "./extracted_qa_pairs/" + csv_file_name
-    pd.DataFrame(questions_answers).rename(columns={"questions": "question", "answers": "answer", "page_numbers": "page"}).to_csv(csv_file_path, index=False)
-    df = pd.read_csv("./pdf_log.csv")
-    df.loc[df["parsed_json_link"] == file_path, "questions_answers_extracted"] = csv_file_path
-    df.to_csv("./pdf_log.csv", index=False)
+    pd.DataFrame(questions_answers).rename(columns={"questions": "question", "answers": "answer", "page_numbers": "page", "refined_answers": "refined_answer"}).to_csv(csv_file_path, index=False)
+    with stage_timer("catalog_io"):
+        ingestion_catalog.update_document_by_parsed_json(file_path, questions_answers_extracted=csv_file_path)
         
     return questions_answers
 
 
-def store_embeddings(file_path: str, question_answers: dict)-> bool:
+def on_document_ingested(file_path: str)-> None:
+    """
+    Refreshes the state derived from the stored documents after a document is embedded, in this process and through the corpus generation in every other process
+
+    Parameters
+    ----------
+    file_path: str
+        The file path of the ingested PDF
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    file_name = os.path.basename(file_path)
+    answer_cache.invalidate_file(file_name)
+    #Publishing the new corpus so the other worker processes rebuild their indexes on their next lookup
+    ingestion_catalog.publish_generation()
+    question_index.refresh()
+    lexical_index.refresh()
+
+
+def store_embeddings(file_path: str, question_answers: dict, content_hash: str | None = None)-> bool:
     """
     Stores question-answer pairs in the Pinecone Vector Database
 
@@ -430,6 +641,9 @@ def store_embeddings(file_path: str, question_answers: dict)-> bool:
 
     question_answers: dict
         The question answer pairs with page numbers
+
+    content_hash: str | None
+        The SHA-256 digest of the PDF recorded in the metadata of every vector
     
     Returns
     -------
@@ -443,30 +657,40 @@ def store_embeddings(file_path: str, question_answers: dict)-> bool:
     questions = question_answers.get("questions", [])
     answers = question_answers.get("answers", [])
     page_numbers = question_answers.get("page_number", [])
+    refined_answers = question_answers.get("refined_answers", [""] * len(questions))
     qa_list = []
     metadata_list = []
-    for q, a, page in zip(questions, answers, page_numbers):
+    for q, a, page, refined in zip(questions, answers, page_numbers, refined_answers):
         pair = f"{q}\n{a}"
         qa_list.append(pair)
 
-        metadata_list.append({"file_name": file_name, "page_number": page})
+        metadata = {"file_name": file_name, "page_number": page}
+        if content_hash:
+            metadata["content_hash"] = content_hash
+        if refined:
+            metadata["refined_answer"] = refined
+        metadata_list.append(metadata)
+    #Naming the vectors after the PDF contents so a resumed or repeated ingestion overwrites them instead of adding duplicates
+    vector_prefix = content_hash or file_name
+    vector_ids = [f"{vector_prefix}-{position}" for position in range(len(qa_list))]
     
     embedding_storage_start_time = time.perf_counter()
     logger.info("Starting Pinecone embedding generation and storage") 
     try:
-        vectorstore = PineconeVectorStore.from_texts(
-            texts=qa_list, 
-            embedding=embeddings, 
-            index_name=index_name,
-            metadatas=metadata_list
-            )
+        vectorstore = get_vectorstore()
+        with stage_timer("embedding_storage"):
+            vectorstore.add_texts(
+                texts=qa_list,
+                metadatas=metadata_list,
+                ids=vector_ids
+                )
 
         elapsed_time = time.perf_counter() - embedding_storage_start_time 
         logger.info("Pinecone embedding generation and storage completed successfully | Time=%.3fs", elapsed_time)
         #Recording embeddings for PDF already created to avoid creating embeddings for the same PDF
-        df = pd.read_csv("./pdf_log.csv")
-        df.loc[df["uploaded_pdf_link"] == file_path, "embeddings_created"] = "created"
-        df.to_csv("./pdf_log.csv", index=False)
+        with stage_timer("catalog_io"):
+            ingestion_catalog.update_document(file_path, embeddings_created="created")
+        on_document_ingested(file_path)
         return True
     except APIStatusError as oae:
         logger.exception("OpenAI API error during embedding generation") 
@@ -485,15 +709,18 @@ def store_embeddings(file_path: str, question_answers: dict)-> bool:
         return f"Connection-{str(e)}"
 
 
-def parse_doc(file_path: str)-> bool:
+def parse_doc(file_path: str, content_hash: str | None = None)-> bool:
     """
-    Sends a request to Upstage AI api to parse the PDF
+    Sends a request to Upstage AI api to parse the PDF, reusing the parsed output of a PDF with the same contents
 
     Parameters
     ----------
     file_path : str
         The file path of the PDF
 
+    content_hash : str | None
+        The SHA-256 digest of the PDF the parsed output is named after. Defaults to the file name
+
     Returns
     -------
     bool
@@ -502,28 +729,36 @@ def parse_doc(file_path: str)-> bool:
     """
 
 
+    name_of_file = os.path.basename(file_path)
+    final_name_of_file = content_hash or name_of_file.replace(".pdf", "")
+    parsed_json_link = f"./json_parsedoutputs/{final_name_of_file}.json"
+    if(content_hash is not None and os.path.exists(parsed_json_link)):
+        with stage_timer("catalog_io"):
+            ingestion_catalog.update_document(file_path, parsed_json_link=parsed_json_link)
+        logger.info("Reusing the parsed output of identical PDF contents | File = %s", name_of_file)
+        return True
+
     parsing_start_time = time.perf_counter() 
     logger.info("Starting Upstage PDF Parsing") 
     url = "https://api.upstage.ai/v1/document-digitization"
     headers = {"Authorization": f"Bearer {upstage_api_key}"}
     files = {"document": open(file_path, "rb")}
     data = {"ocr": "force", "base64_encoding": "['table']", "model": "document-parse-260128", "output_formats": "['html', 'text', 'markdown']"}
-    response = requests.post(url, headers=headers, files=files, data=data)
+    with stage_timer("upstage_parse"):
+        response = requests.post(url, headers=headers, files=files, data=data)
     elapsed_time = time.perf_counter() - parsing_start_time 
     if(response.status_code == 200):       
         json_response = response.json()
-        name_of_file = os.path.basename(file_path)
-        final_name_of_file = name_of_file.replace(".pdf", "")
-        with open(f"./json_parsedoutputs/{final_name_of_file}.json", "w", encoding="utf-8") as f:
+        with open(parsed_json_link, "w", encoding="utf-8") as f:
            json.dump(json_response, f, indent=4, ensure_ascii=False)
            
            #Recording PDF is already parsed to avoid api call again
-           df = pd.read_csv("./pdf_log.csv")
-           df.loc[df["uploaded_pdf_link"] == file_path, "parsed_json_link"] = f"./json_parsedoutputs/{final_name_of_file}.json"
-           df.to_csv("./pdf_log.csv", index=False)
+           with stage_timer("catalog_io"):
+               ingestion_catalog.update_document(file_path, parsed_json_link=parsed_json_link)
            logger.info("Upstage AI PDF Parsing completed successfully | Time=%.3fs", elapsed_time) 
         return True
     else:
+        stage_errors.inc("upstage_parse")
         logger.error("Upstage AI PDF Parsing failed", response.status_code, elapsed_time)
         return False
 
@@ -545,6 +780,7 @@ def upload_pdf(path: str)-> dict:
     """
     
     
+    import pandas as pd
     pdf_processing_start_time = time.perf_counter() 
     logger.info("Start PDF Processing pipeline") 
     if path == None:
@@ -560,24 +796,34 @@ def upload_pdf(path: str)-> dict:
 
     os.makedirs(directory_path_to_save, exist_ok = True)
     os.makedirs(json_output_dir, exist_ok = True)
-    df = pd.read_csv("./pdf_log.csv")
+    #Identifying the PDF by its contents so a renamed duplicate is not processed again and a changed PDF with an old name is processed as new content
+    content_hash = compute_content_hash(path)
     file_name = os.path.basename(path)
+    json_file_path = os.path.join(json_output_dir, content_hash + ".json")
     file_path = os.path.join(directory_path_to_save, file_name)
-    json_file_path = os.path.join(json_output_dir, file_name.replace(".pdf", ".json"))
-    if(os.path.exists(file_path)):
-        embeddings_created = df.loc[df["uploaded_pdf_link"] == file_path, "embeddings_created"].squeeze()
-        json_parsed_link_created = df.loc[df["uploaded_pdf_link"] == file_path, "parsed_json_link"].squeeze()
-        qa_pairs_extracted = df.loc[df["uploaded_pdf_link"] == file_path, "questions_answers_extracted"].squeeze()
+    if(os.path.exists(file_path) and compute_content_hash(file_path) != content_hash):
+        logger.info("A different PDF was uploaded under an existing name | File = %s", file_name)
+        file_path = os.path.join(directory_path_to_save, file_name.replace(".pdf", "") + "-" + content_hash[:12] + ".pdf")
+    #Registering the PDF in the transaction that looks up its contents so only one of concurrent uploads of the same PDF ingests it
+    with stage_timer("catalog_io"):
+        ingestion_catalog.backfill_content_hashes()
+        document, registered = ingestion_catalog.claim_document(file_path, content_hash)
+    file_path = document["uploaded_pdf_link"]
+    embeddings_created = document["embeddings_created"]
+    json_parsed_link_created = document["parsed_json_link"]
+    qa_pairs_extracted = document["questions_answers_extracted"]
+    if(not registered and not os.path.exists(file_path)):
+        shutil.copy(path, file_path)
     
-    if(os.path.exists(file_path) and isinstance(embeddings_created, str)):
+    if(not registered and isinstance(embeddings_created, str)):
         logger.warning("File already uploaded and embedded") 
         return {
         "success": False,
         "status_code": 409,
         "message": "This file has already been uploaded and embedded. Please upload a new file."
         }
-    if(os.path.exists(file_path) and pd.isna(json_parsed_link_created)):
-        result = parse_doc(file_path)
+    if(not registered and json_parsed_link_created is None):
+        result = parse_doc(file_path, content_hash)
         if(result == False):
             logger.error("PDF Processing failed during UpstageAI parsing") 
             return {
@@ -595,7 +841,7 @@ def upload_pdf(path: str)-> dict:
                 "message": "There was an error in the Open AI API. Unable to extract questions and answers from the PDF."
                 }
             else:
-                result = store_embeddings(file_path, qa_pairs)
+                result = store_embeddings(file_path, qa_pairs, content_hash)
                 if(isinstance(result, str)):
                     logger.error("PDF Processing failed during embedding storage") 
                     if "OpenAIAPI" in result:
@@ -635,7 +881,7 @@ def upload_pdf(path: str)-> dict:
                     "success": True,
                     "message": "PDF successfully stored in Vector Database."
                     }
-    if(os.path.exists(file_path) and isinstance(json_parsed_link_created, str) and pd.isna(qa_pairs_extracted)):
+    if(not registered and isinstance(json_parsed_link_created, str) and qa_pairs_extracted is None):
         qa_pairs = extract_questions_answers(json_parsed_link_created)
         if(qa_pairs == "There was an error in the Open AI API. Unable to extract questions and answers from the PDF."):
             logger.error("PDF Processing failed due to Open AI API") 
@@ -645,7 +891,7 @@ def upload_pdf(path: str)-> dict:
             "message": "There was an error in the Open AI API. Unable to extract questions and answers from the PDF."
             }
         else:
-            result = store_embeddings(file_path, qa_pairs)
+            result = store_embeddings(file_path, qa_pairs, content_hash)
             if(isinstance(result, str)):
                 logger.error("PDF Processing failed due to embeddding storage") 
                 if "OpenAIAPI" in result:
@@ -685,10 +931,12 @@ def upload_pdf(path: str)-> dict:
                 "success": True,
                 "message": "PDF successfully stored in Vector Database."
                 }
-    if(os.path.exists(file_path) and isinstance(json_parsed_link_created, str) and isinstance(qa_pairs_extracted, str) and pd.isna(embeddings_created)):
+    if(not registered and isinstance(json_parsed_link_created, str) and isinstance(qa_pairs_extracted, str) and embeddings_created is None):
         df_qa = pd.read_csv(qa_pairs_extracted)
         qa_pairs = {"questions": df_qa["question"].tolist(), "answers": df_qa["answer"].tolist(), "page_number": df_qa["page_number"].tolist()}
-        result = store_embeddings(file_path, qa_pairs)
+        if "refined_answer" in df_qa.columns:
+            qa_pairs["refined_answers"] = df_qa["refined_answer"].fillna("").tolist()
+        result = store_embeddings(file_path, qa_pairs, content_hash)
         if(isinstance(result, str)):
             logger.error("PDF Processing failed during embedding generation")
             if "OpenAIAPI" in result:
@@ -730,16 +978,7 @@ def upload_pdf(path: str)-> dict:
             }
     else:
         shutil.copy(path, file_path)
-        new_row = {
-        "uploaded_pdf_link": file_path,
-        "parsed_json_link": None,
-        "question_answers_extracted": None,
-        "embeddings_created": None
-        }
-        
-        df_new = pd.DataFrame([new_row])
-        df_new.to_csv("./pdf_log.csv", mode="a", index=False, header=not os.path.exists("./pdf_log.csv"))
-        result = parse_doc(file_path)
+        result = parse_doc(file_path, content_hash)
         if(result == False):
             logger.error("PDF Processing failed during Upstage AI parsing")
             return {
@@ -757,7 +996,7 @@ def upload_pdf(path: str)-> dict:
                 "message": "There was an error in the Open AI API. Unable to extract questions and answers from the PDF."
                 }    
             else:
-                result = store_embeddings(file_path, qa_pairs)
+                result = store_embeddings(file_path, qa_pairs, content_hash)
                 if(isinstance(result, str)):
                     logger.error("PDF Processing failed during embedding storage")
                     if "OpenAIAPI" in result:
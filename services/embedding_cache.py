@@ -0,0 +1,245 @@
+"""
+The module comprises of the query embedding cache placed in front of the OpenAI embeddings.
+"""
+
+import logging
+from array import array
+from langchain_core.embeddings import Embeddings
+from core.cache import LRUCache
+from core.shared_cache import SharedCache
+from core.tracing import set_attribute
+from core.metrics import stage_timer
+from core.normalization import normalize_query
+
+logger = logging.getLogger("faq-qa-bot")
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an embeddings model and caches query embeddings by normalized query text
+
+    """
+
+
+    def __init__(self, embeddings: Embeddings, max_entries: int = 10000, ttl: float | None = None, shared_cache: SharedCache | None = None):
+        """
+        Creates the cached embeddings
+
+        Parameters
+        ----------
+        embeddings: Embeddings
+            The underlying embeddings model
+
+        max_entries: int
+            The maximum number of query embeddings held in memory
+
+        ttl: float | None
+            The number of seconds an embedding stays valid, or None for no expiry
+
+        shared_cache: SharedCache | None
+            The optional cache tier shared with the other processes on the host
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.embeddings = embeddings
+        self.memory_cache = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.shared_cache = shared_cache
+
+    def _lookup(self, key: str)-> list | None:
+        """
+        Looks the key up in memory and then in the shared cache
+
+        Parameters
+        ----------
+        key: str
+            The normalized query
+
+        Returns
+        -------
+        list | None
+            The cached embedding
+
+        """
+
+
+        vector = self.memory_cache.get(key)
+        cache_result = "memory"
+        if vector is None and self.shared_cache is not None:
+            entry = self.shared_cache.get(key)
+            cache_result = "shared"
+            if entry is not None:
+                stored_vector = array("f")
+                stored_vector.frombytes(entry["value"])
+                vector = stored_vector.tolist()
+                self.memory_cache.set(key, vector)
+        set_attribute("embedding_cache", cache_result if vector is not None else "miss")
+        return vector
+
+    def _store(self, key: str, vector: list)-> None:
+        """
+        Stores the embedding in memory and as float32 in the shared cache
+
+        Parameters
+        ----------
+        key: str
+            The normalized query
+
+        vector: list
+            The embedding
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.memory_cache.set(key, vector)
+        if self.shared_cache is not None:
+            self.shared_cache.set(key, array("f", vector).tobytes())
+
+    def embed_query(self, text: str)-> list:
+        """
+        Returns the embedding of the query, calling the embeddings model only on a cache miss and timing only that call as the embedding stage
+
+        Parameters
+        ----------
+        text: str
+            The query sent by the user
+
+        Returns
+        -------
+        list
+            The query embedding
+
+        """
+
+
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector
+        with stage_timer("embedding"):
+            vector = self.embeddings.embed_query(text)
+        self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str)-> list:
+        """
+        Returns the embedding of the query asynchronously, calling the embeddings model only on a cache miss
+
+        Parameters
+        ----------
+        text: str
+            The query sent by the user
+
+        Returns
+        -------
+        list
+            The query embedding
+
+        """
+
+
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is not None:
+            return vector
+        with stage_timer("embedding"):
+            vector = await self.embeddings.aembed_query(text)
+        self._store(key, vector)
+        return vector
+
+    async def aembed_queries(self, texts: list)-> list:
+        """
+        Returns the embeddings of many queries, embedding every cache miss in one bulk request
+
+        Parameters
+        ----------
+        texts: list
+            The queries sent by the users
+
+        Returns
+        -------
+        list
+            The query embeddings in the order of the queries
+
+        """
+
+
+        keys = [normalize_query(text) for text in texts]
+        vectors = {key: self._lookup(key) for key in keys}
+        missing_texts = {}
+        for key, text in zip(keys, texts):
+            if vectors[key] is None:
+                missing_texts.setdefault(key, text)
+        if missing_texts:
+            with stage_timer("embedding", queries=len(missing_texts)):
+                missing_vectors = await self.embeddings.aembed_documents(list(missing_texts.values()))
+            for key, vector in zip(missing_texts, missing_vectors):
+                self._store(key, vector)
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    def embed_documents(self, texts: list)-> list:
+        """
+        Embeds documents without caching since stored documents are embedded once
+
+        Parameters
+        ----------
+        texts: list
+            The documents to be embedded
+
+        Returns
+        -------
+        list
+            The document embeddings
+
+        """
+
+
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list)-> list:
+        """
+        Embeds documents asynchronously without caching
+
+        Parameters
+        ----------
+        texts: list
+            The documents to be embedded
+
+        Returns
+        -------
+        list
+            The document embeddings
+
+        """
+
+
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self)-> dict:
+        """
+        Returns the cache counters
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict
+            The memory cache counters and the shared cache counters
+
+        """
+
+
+        cache_stats = self.memory_cache.stats()
+        cache_stats["shared"] = self.shared_cache.stats() if self.shared_cache is not None else None
+        return cache_stats
@@ -0,0 +1,494 @@
+"""
+The module comprises of the transactional SQLite catalog recording the ingestion state of every uploaded PDF.
+"""
+
+import os
+import csv
+import time
+import logging
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+logger = logging.getLogger("faq-qa-bot")
+ingestion_catalog_path = os.getenv("INGESTION_CATALOG_PATH", "./ingestion_catalog.sqlite3")
+pdf_log_path = os.getenv("PDF_LOG_PATH", "./pdf_log.csv")
+corpus_generation_poll_interval = float(os.getenv("CORPUS_GENERATION_POLL_INTERVAL", 1.0))
+catalog_columns = ("uploaded_pdf_link", "parsed_json_link", "questions_answers_extracted", "embeddings_created", "content_hash")
+
+
+def compute_content_hash(path: str, chunk_size: int = 1048576)-> str:
+    """
+    Computes the SHA-256 digest of a file, reading it in chunks so large PDFs are never held in memory
+
+    Parameters
+    ----------
+    path: str
+        The file path
+
+    chunk_size: int
+        The number of bytes read at a time
+
+    Returns
+    -------
+    str
+        The hex digest of the file contents
+
+    """
+
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IngestionCatalog:
+    """
+    The ingestion state of the uploaded PDFs in a SQLite database in WAL mode, indexed by path and content hash and safe to write from several processes
+
+    """
+
+
+    def __init__(self, path: str, legacy_csv_path: str | None = None, generation_poll_interval: float = 1.0):
+        """
+        Creates the catalog without opening the database, so it can be created before the server forks
+
+        Parameters
+        ----------
+        path: str
+            The path of the SQLite file
+
+        legacy_csv_path: str | None
+            The pdf log CSV file migrated into the catalog when it is created
+
+        generation_poll_interval: float
+            The number of seconds the corpus generation is cached in this process
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.path = path
+        self.legacy_csv_path = legacy_csv_path
+        self.generation_poll_interval = generation_poll_interval
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._generation = 0
+        self._generation_loaded_at = None
+
+    def _connect(self)-> sqlite3.Connection:
+        """
+        Returns the connection of the current process, opening it and migrating the pdf log on first use and after a fork
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        sqlite3.Connection
+            The connection in WAL mode
+
+        """
+
+
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents (uploaded_pdf_link TEXT PRIMARY KEY, parsed_json_link TEXT, "
+            "questions_answers_extracted TEXT, embeddings_created TEXT, content_hash TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS documents_parsed_json ON documents (parsed_json_link)")
+        connection.execute("CREATE INDEX IF NOT EXISTS documents_content_hash ON documents (content_hash)")
+        connection.execute("CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._migrate(connection)
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+    def _migrate(self, connection: sqlite3.Connection)-> None:
+        """
+        Imports the rows of the pdf log CSV file once, in the transaction of the first process that opens the catalog
+
+        Parameters
+        ----------
+        connection: sqlite3.Connection
+            The new connection
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("SELECT 1 FROM catalog_meta WHERE key = 'migrated_from'").fetchone() is None:
+                migrated = 0
+                if self.legacy_csv_path and os.path.exists(self.legacy_csv_path):
+                    now = time.time()
+                    with open(self.legacy_csv_path, mode="r", newline="", encoding="utf-8") as log_file:
+                        for row in csv.DictReader(log_file):
+                            if not row.get("uploaded_pdf_link"):
+                                continue
+                            values = [row.get(column) or None for column in catalog_columns]
+                            connection.execute(
+                                "INSERT OR REPLACE INTO documents (uploaded_pdf_link, parsed_json_link, questions_answers_extracted, "
+                                "embeddings_created, content_hash, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                (*values, now, now)
+                            )
+                            migrated += 1
+                connection.execute("INSERT INTO catalog_meta (key, value) VALUES ('migrated_from', ?)", (str(self.legacy_csv_path),))
+                if migrated:
+                    logger.info("Ingestion catalog migrated from the pdf log | Documents = %d", migrated)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get_document(self, uploaded_pdf_link: str)-> dict | None:
+        """
+        Returns the ingestion state of an uploaded PDF
+
+        Parameters
+        ----------
+        uploaded_pdf_link: str
+            The path of the uploaded PDF
+
+        Returns
+        -------
+        dict | None
+            The catalog row, or None if the PDF is not in the catalog
+
+        """
+
+
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM documents WHERE uploaded_pdf_link = ?", (uploaded_pdf_link,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_document_by_hash(self, content_hash: str)-> dict | None:
+        """
+        Returns the ingestion state of the PDF with the content hash, preferring an embedded one
+
+        Parameters
+        ----------
+        content_hash: str
+            The SHA-256 hex digest of the PDF
+
+        Returns
+        -------
+        dict | None
+            The catalog row, or None if no PDF with the content hash is in the catalog
+
+        """
+
+
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM documents WHERE content_hash = ? ORDER BY embeddings_created IS NULL, updated_at DESC LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def claim_document(self, uploaded_pdf_link: str, content_hash: str)-> tuple:
+        """
+        Returns the PDF with the content hash, registering the uploaded PDF in the same transaction if there is none, so concurrent uploads of the same contents register it once
+
+        Parameters
+        ----------
+        uploaded_pdf_link: str
+            The path the PDF is stored at if it is new
+
+        content_hash: str
+            The SHA-256 hex digest of the PDF
+
+        Returns
+        -------
+        tuple
+            The catalog row, and whether it was registered by this call
+
+        """
+
+
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT * FROM documents WHERE content_hash = ? ORDER BY embeddings_created IS NULL, updated_at DESC LIMIT 1",
+                    (content_hash,)
+                ).fetchone()
+                registered = row is None
+                if registered:
+                    connection.execute(
+                        "INSERT INTO documents (uploaded_pdf_link, content_hash, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (uploaded_pdf_link) DO UPDATE SET parsed_json_link = NULL, questions_answers_extracted = NULL, "
+                        "embeddings_created = NULL, content_hash = excluded.content_hash, updated_at = excluded.updated_at",
+                        (uploaded_pdf_link, content_hash, now, now)
+                    )
+                    row = connection.execute("SELECT * FROM documents WHERE uploaded_pdf_link = ?", (uploaded_pdf_link,)).fetchone()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return dict(row), registered
+
+    def update_document(self, uploaded_pdf_link: str, **fields)-> int:
+        """
+        Records the completion of an ingestion stage of an uploaded PDF
+
+        Parameters
+        ----------
+        uploaded_pdf_link: str
+            The path of the uploaded PDF
+
+        fields: dict
+            The catalog columns to be set, e.g. parsed_json_link
+
+        Returns
+        -------
+        int
+            The number of updated rows
+
+        """
+
+
+        return self._update("uploaded_pdf_link", uploaded_pdf_link, fields)
+
+    def update_document_by_parsed_json(self, parsed_json_link: str, **fields)-> int:
+        """
+        Records the completion of an ingestion stage of the PDF parsed into the JSON file
+
+        Parameters
+        ----------
+        parsed_json_link: str
+            The path of the parsed JSON file
+
+        fields: dict
+            The catalog columns to be set, e.g. questions_answers_extracted
+
+        Returns
+        -------
+        int
+            The number of updated rows
+
+        """
+
+
+        return self._update("parsed_json_link", parsed_json_link, fields)
+
+    def _update(self, key_column: str, key: str, fields: dict)-> int:
+        """
+        Sets catalog columns of the rows matching the key in a single statement
+
+        Parameters
+        ----------
+        key_column: str
+            The indexed column the rows are looked up by
+
+        key: str
+            The value of the key column
+
+        fields: dict
+            The catalog columns to be set
+
+        Returns
+        -------
+        int
+            The number of updated rows
+
+        """
+
+
+        unknown = set(fields) - set(catalog_columns[1:])
+        if unknown:
+            raise ValueError(f"Unknown catalog columns: {', '.join(sorted(unknown))}")
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            return self._connect().execute(
+                f"UPDATE documents SET {assignments}, updated_at = ? WHERE {key_column} = ?",
+                (*fields.values(), time.time(), key)
+            ).rowcount
+
+    def backfill_content_hashes(self)-> int:
+        """
+        Hashes the uploaded PDFs recorded before the catalog tracked content hashes, so their duplicates are recognized
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int
+            The number of hashed documents
+
+        """
+
+
+        with self._lock:
+            rows = self._connect().execute("SELECT uploaded_pdf_link FROM documents WHERE content_hash IS NULL").fetchall()
+        hashed = 0
+        for row in rows:
+            if os.path.exists(row["uploaded_pdf_link"]):
+                hashed += self._update("uploaded_pdf_link", row["uploaded_pdf_link"], {"content_hash": compute_content_hash(row["uploaded_pdf_link"])})
+        return hashed
+
+    def publish_generation(self)-> int:
+        """
+        Advances the corpus generation after a document is embedded, so every process rebuilds the indexes derived from the stored documents
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int
+            The new corpus generation
+
+        """
+
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT INTO catalog_meta (key, value) VALUES ('corpus_generation', '1') "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+            generation = int(connection.execute("SELECT value FROM catalog_meta WHERE key = 'corpus_generation'").fetchone()["value"])
+            self._generation = generation
+            self._generation_loaded_at = time.monotonic()
+        return generation
+
+    def generation(self)-> int:
+        """
+        Returns the corpus generation published by any process, polling the database at most once per interval
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int
+            The corpus generation, 0 before the first document is embedded
+
+        """
+
+
+        now = time.monotonic()
+        if self._generation_loaded_at is None or now - self._generation_loaded_at > self.generation_poll_interval:
+            try:
+                with self._lock:
+                    row = self._connect().execute("SELECT value FROM catalog_meta WHERE key = 'corpus_generation'").fetchone()
+                self._generation = int(row["value"]) if row is not None else 0
+            except sqlite3.Error:
+                logger.exception("Corpus generation poll failed")
+            self._generation_loaded_at = now
+        return self._generation
+
+    def list_documents(self, embedded_only: bool = False)-> list:
+        """
+        Returns the ingestion state of every PDF in upload order
+
+        Parameters
+        ----------
+        embedded_only: bool
+            Returns only the PDFs whose embeddings have been created
+
+        Returns
+        -------
+        list
+            The catalog rows
+
+        """
+
+
+        query = "SELECT * FROM documents"
+        if embedded_only:
+            query += " WHERE embeddings_created = 'created'"
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY created_at, rowid").fetchall()
+        return [dict(row) for row in rows]
+
+    def export_csv(self, path: str)-> int:
+        """
+        Writes the catalog in the column layout of the pdf log CSV file
+
+        Parameters
+        ----------
+        path: str
+            The path of the CSV file
+
+        Returns
+        -------
+        int
+            The number of exported documents
+
+        """
+
+
+        documents = self.list_documents()
+        with open(path, mode="w", newline="", encoding="utf-8") as log_file:
+            writer = csv.DictWriter(log_file, fieldnames=catalog_columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(documents)
+        return len(documents)
+
+    def remove_document(self, uploaded_pdf_link: str)-> bool:
+        """
+        Removes an uploaded PDF from the catalog so it is ingested again on its next upload
+
+        Parameters
+        ----------
+        uploaded_pdf_link: str
+            The path of the uploaded PDF
+
+        Returns
+        -------
+        bool
+            Whether the PDF was in the catalog
+
+        """
+
+
+        with self._lock:
+            return self._connect().execute("DELETE FROM documents WHERE uploaded_pdf_link = ?", (uploaded_pdf_link,)).rowcount > 0
+
+
+ingestion_catalog = IngestionCatalog(ingestion_catalog_path, pdf_log_path, corpus_generation_poll_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports or edits the ingestion catalog of the uploaded PDFs")
+    parser.add_argument("--export", metavar="CSV_PATH", help="Write the catalog to a CSV file in the pdf log layout")
+    parser.add_argument("--remove", metavar="PDF_PATH", help="Remove an uploaded PDF, e.g. ./uploaded_pdfdocs/X.pdf, so it is ingested again")
+    args = parser.parse_args()
+    if args.remove:
+        removed = ingestion_catalog.remove_document(args.remove)
+        print(f"Removed {args.remove}" if removed else f"{args.remove} is not in the catalog")
+    if args.export:
+        count = ingestion_catalog.export_csv(args.export)
+        print(f"Exported {count} documents to {args.export}")
+    if not args.remove and not args.export:
+        for document in ingestion_catalog.list_documents():
+            print(document["uploaded_pdf_link"], document["parsed_json_link"], document["questions_answers_extracted"], document["embeddings_created"], sep=" | ")
@@ -0,0 +1,588 @@
+"""
+The module comprises of the persistent background job queue that runs the PDF ingestion pipeline outside of the request.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.request_context import request_id_context
+from core.tracing import span
+from services.ingestion_catalog import ingestion_catalog, ingestion_catalog_path, compute_content_hash
+
+logger = logging.getLogger("faq-qa-bot")
+ingestion_workers = int(os.getenv("INGESTION_WORKERS", 2))
+ingestion_jobs_dir = os.getenv("INGESTION_JOBS_DIR", "./uploads/jobs")
+ingestion_job_lease = float(os.getenv("INGESTION_JOB_LEASE", 60))
+ingestion_job_max_attempts = int(os.getenv("INGESTION_JOB_MAX_ATTEMPTS", 3))
+ingestion_job_poll_interval = float(os.getenv("INGESTION_JOB_POLL_INTERVAL", 5))
+ingestion_stages = ("parse", "extract", "embed")
+_stage_columns = {"parse": "parsed_json_link", "extract": "questions_answers_extracted", "embed": "embeddings_created"}
+
+
+class IngestionJobStore:
+    """
+    The ingestion jobs in a SQLite table next to the ingestion catalog, claimed under a renewed lease so a job runs in one worker at a time and is requeued when its worker dies
+
+    """
+
+
+    def __init__(self, path: str):
+        """
+        Creates the store without opening the database, so it can be created before the server forks
+
+        Parameters
+        ----------
+        path: str
+            The path of the SQLite file
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+
+    def _connect(self)-> sqlite3.Connection:
+        """
+        Returns the connection of the current process, opening it on first use and after a fork
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        sqlite3.Connection
+            The connection in WAL mode
+
+        """
+
+
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS ingestion_jobs (job_id TEXT PRIMARY KEY, file_name TEXT NOT NULL, upload_path TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, status TEXT NOT NULL, status_code INTEGER, message TEXT, owner_pid INTEGER, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL, lease_token TEXT, lease_expires_at REAL)"
+        )
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(ingestion_jobs)")}
+        for column, column_type in (("lease_token", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                connection.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} {column_type}")
+        connection.execute("CREATE INDEX IF NOT EXISTS ingestion_jobs_status ON ingestion_jobs (status)")
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+    def create(self, job_id: str, file_name: str, upload_path: str, content_hash: str)-> None:
+        """
+        Records a queued job
+
+        Parameters
+        ----------
+        job_id: str
+            The job ID
+
+        file_name: str
+            The file name of the uploaded PDF
+
+        upload_path: str
+            The path of the copy of the upload kept until the job finishes
+
+        content_hash: str
+            The SHA-256 digest of the PDF
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO ingestion_jobs (job_id, file_name, upload_path, content_hash, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, file_name, upload_path, content_hash, now, now)
+            )
+
+    def get(self, job_id: str)-> dict | None:
+        """
+        Returns a job
+
+        Parameters
+        ----------
+        job_id: str
+            The job ID
+
+        Returns
+        -------
+        dict | None
+            The job row, or None if the job does not exist
+
+        """
+
+
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def claim(self, job_id: str)-> str | None:
+        """
+        Marks a queued job as running under a new lease
+
+        Parameters
+        ----------
+        job_id: str
+            The job ID
+
+        Returns
+        -------
+        str | None
+            The lease token, or None if another worker already claimed the job or is ingesting the same PDF
+
+        """
+
+
+        lease_token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            claimed = self._connect().execute(
+                "UPDATE ingestion_jobs SET status = 'running', owner_pid = ?, lease_token = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ? AND status = 'queued' AND NOT EXISTS (SELECT 1 FROM ingestion_jobs AS other WHERE other.status = 'running' "
+                "AND other.content_hash = ingestion_jobs.content_hash)",
+                (os.getpid(), lease_token, now + ingestion_job_lease, now, job_id)
+            ).rowcount == 1
+        return lease_token if claimed else None
+
+    def renew(self, job_id: str, lease_token: str)-> bool:
+        """
+        Extends the lease of a running job
+
+        Parameters
+        ----------
+        job_id: str
+            The job ID
+
+        lease_token: str
+            The token returned by claim
+
+        Returns
+        -------
+        bool
+            Whether the lease is still held, False if it expired and the job was requeued
+
+        """
+
+
+        now = time.time()
+        with self._lock:
+            return self._connect().execute(
+                "UPDATE ingestion_jobs SET lease_expires_at = ?, updated_at = ? WHERE job_id = ? AND status = 'running' AND lease_token = ?",
+                (now + ingestion_job_lease, now, job_id, lease_token)
+            ).rowcount == 1
+
+    def finish(self, job_id: str, lease_token: str, result: dict)-> bool:
+        """
+        Records the result of a job
+
+        Parameters
+        ----------
+        job_id: str
+            The job ID
+
+        lease_token: str
+            The token returned by claim
+
+        result: dict
+            The result of upload_pdf
+
+        Returns
+        -------
+        bool
+            Whether the result was recorded, False if the lease was lost to another worker
+
+        """
+
+
+        with self._lock:
+            return self._connect().execute(
+                "UPDATE ingestion_jobs SET status = ?, status_code = ?, message = ?, lease_token = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE job_id = ? AND lease_token = ?",
+                ("succeeded" if result["success"] else "failed", result.get("status_code", 200), result["message"], time.time(), job_id, lease_token)
+            ).rowcount == 1
+
+    def requeue_expired(self)-> tuple:
+        """
+        Requeues the running jobs whose lease expired, failing those that used up their attempts, and returns every queued job
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        tuple
+            The IDs of the queued jobs, oldest first, and the upload paths of the jobs that were failed
+
+        """
+
+
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                failed_uploads = [
+                    row["upload_path"] for row in connection.execute(
+                        "SELECT upload_path FROM ingestion_jobs WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?) AND attempts >= ?",
+                        (now, ingestion_job_max_attempts)
+                    )
+                ]
+                failed = connection.execute(
+                    "UPDATE ingestion_jobs SET status = 'failed', status_code = 500, message = ?, lease_token = NULL, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?) AND attempts >= ?",
+                    (f"PDF not successfully processed after {ingestion_job_max_attempts} attempts. Please upload the file again.", now, now, ingestion_job_max_attempts)
+                ).rowcount
+                requeued = connection.execute(
+                    "UPDATE ingestion_jobs SET status = 'queued', lease_token = NULL, lease_expires_at = NULL, updated_at = ? "
+                    "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+                    (now, now)
+                ).rowcount
+                rows = connection.execute("SELECT job_id FROM ingestion_jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        if failed or requeued:
+            logger.warning("Ingestion job leases expired | Requeued = %d | Failed = %d", requeued, failed)
+        return [row["job_id"] for row in rows], failed_uploads
+
+
+job_store = IngestionJobStore(ingestion_catalog_path)
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_pending_jobs = set()
+_reaper = None
+_reaper_stop = threading.Event()
+
+
+def _get_executor()-> ThreadPoolExecutor:
+    """
+    Returns the bounded worker pool of the current process, creating it on first use and after a fork
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    ThreadPoolExecutor
+        The worker pool
+
+    """
+
+
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=ingestion_workers, thread_name_prefix="ingestion")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _renew_lease(job_id: str, lease_token: str, stop: threading.Event)-> None:
+    """
+    Renews the lease of a running job until the job finishes or the lease is lost
+
+    Parameters
+    ----------
+    job_id: str
+        The job ID
+
+    lease_token: str
+        The token returned by claim
+
+    stop: threading.Event
+        Set when the job finishes
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    while not stop.wait(ingestion_job_lease / 3):
+        try:
+            if not job_store.renew(job_id, lease_token):
+                logger.warning("Ingestion job lease lost | Job = %s", job_id)
+                return
+        except sqlite3.Error:
+            logger.exception("Ingestion job lease not renewed | Job = %s", job_id)
+
+
+def _run_job(job_id: str)-> None:
+    """
+    Claims a queued job and runs the ingestion pipeline under a renewed lease, which resumes from the last stage recorded in the ingestion catalog
+
+    Parameters
+    ----------
+    job_id: str
+        The job ID
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    from services.doc_tools import upload_pdf
+
+    with _executor_lock:
+        _pending_jobs.discard(job_id)
+    lease_token = job_store.claim(job_id)
+    if lease_token is None:
+        return
+    job = job_store.get(job_id)
+    token = request_id_context.set(job_id)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_renew_lease, args=(job_id, lease_token, stop), name=f"ingestion-lease-{job_id[:8]}", daemon=True)
+    heartbeat.start()
+    try:
+        logger.info("Ingestion job started | Job = %s | File = %s | Attempt = %d", job_id, job["file_name"], job["attempts"])
+        with span("ingestion_job", job_id=job_id, file_name=job["file_name"]):
+            try:
+                result = upload_pdf(job["upload_path"])
+            except Exception:
+                logger.exception("Ingestion job failed | Job = %s", job_id)
+                result = {
+                "success": False,
+                "status_code": 500,
+                "message": "PDF not successfully processed. Please upload the file again."
+                }
+        stop.set()
+        heartbeat.join()
+        if not job_store.finish(job_id, lease_token, result):
+            logger.warning("Ingestion job result discarded because its lease expired | Job = %s", job_id)
+            return
+        logger.info("Ingestion job finished | Job = %s | Success = %s", job_id, result["success"])
+        shutil.rmtree(os.path.dirname(job["upload_path"]), ignore_errors=True)
+    finally:
+        stop.set()
+        request_id_context.reset(token)
+
+
+def _queue(job_ids: list)-> int:
+    """
+    Submits jobs to the worker pool of the current process, skipping those already waiting in it
+
+    Parameters
+    ----------
+    job_ids: list
+        The job IDs
+
+    Returns
+    -------
+    int
+        The number of submitted jobs
+
+    """
+
+
+    executor = _get_executor()
+    with _executor_lock:
+        job_ids = [job_id for job_id in job_ids if job_id not in _pending_jobs]
+        _pending_jobs.update(job_ids)
+    for job_id in job_ids:
+        executor.submit(_run_job, job_id)
+    return len(job_ids)
+
+
+def submit_job(path: str)-> dict:
+    """
+    Queues the ingestion of an uploaded PDF, keeping a copy of the file so the job survives a restart, and runs it in this process if it runs ingestion jobs
+
+    Parameters
+    ----------
+    path: str
+        The path of the uploaded PDF
+
+    Returns
+    -------
+    dict
+        The queued job
+
+    """
+
+
+    job_id = str(uuid.uuid4())
+    file_name = os.path.basename(path)
+    upload_path = os.path.join(ingestion_jobs_dir, job_id, file_name)
+    os.makedirs(os.path.dirname(upload_path), exist_ok=True)
+    shutil.copy(path, upload_path)
+    job_store.create(job_id, file_name, upload_path, compute_content_hash(upload_path))
+    #A process that does not run the jobs, e.g. the Gradio interface in "ui" mode, leaves them to the polling job runners
+    if _reaper is not None:
+        _queue([job_id])
+    logger.info("Ingestion job queued | Job = %s | File = %s", job_id, file_name)
+    return get_job(job_id)
+
+
+def get_job(job_id: str)-> dict | None:
+    """
+    Returns the status of a job with the progress of every ingestion stage of its PDF
+
+    Parameters
+    ----------
+    job_id: str
+        The job ID
+
+    Returns
+    -------
+    dict | None
+        The job ID, file name, status, current stage, stage progress, status code, and message, or None if the job does not exist
+
+    """
+
+
+    job = job_store.get(job_id)
+    if job is None:
+        return None
+    document = ingestion_catalog.get_document_by_hash(job["content_hash"])
+    stages = {stage: "done" if document is not None and document[column] else "pending" for stage, column in _stage_columns.items()}
+    stage = None
+    if job["status"] == "running":
+        stage = next((name for name in ingestion_stages if stages[name] == "pending"), None)
+        if stage is not None:
+            stages[stage] = "running"
+    return {
+        "job_id": job["job_id"],
+        "file_name": job["file_name"],
+        "status": job["status"],
+        "stage": stage,
+        "stages": stages,
+        "status_code": job["status_code"],
+        "message": job["message"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+
+def _recover_jobs()-> int:
+    """
+    Requeues the jobs whose lease expired, removing the uploads of those failed after their last attempt, and submits every queued job to the worker pool
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    int
+        The number of submitted jobs
+
+    """
+
+
+    job_ids, failed_uploads = job_store.requeue_expired()
+    #The failed jobs are not run again, so their copies of the uploads are removed like those of finished jobs
+    for upload_path in failed_uploads:
+        shutil.rmtree(os.path.dirname(upload_path), ignore_errors=True)
+    queued = _queue(job_ids)
+    if queued:
+        logger.info("Resuming ingestion jobs | Jobs = %d", queued)
+    return queued
+
+
+def _reap_jobs()-> None:
+    """
+    Recovers the jobs of dead workers and picks up the jobs queued by other processes every poll interval until the jobs are stopped
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    while not _reaper_stop.wait(min(ingestion_job_poll_interval, ingestion_job_lease)):
+        try:
+            _recover_jobs()
+        except Exception:
+            logger.exception("Ingestion job recovery failed")
+
+
+def resume_jobs()-> int:
+    """
+    Queues the jobs that were waiting or whose worker died, and keeps recovering expired leases in the background
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    int
+        The number of resumed jobs
+
+    """
+
+
+    global _reaper
+    resumed = _recover_jobs()
+    with _executor_lock:
+        if _reaper is None or not _reaper.is_alive():
+            _reaper_stop.clear()
+            _reaper = threading.Thread(target=_reap_jobs, name="ingestion-reaper", daemon=True)
+            _reaper.start()
+    return resumed
+
+
+def stop_jobs()-> None:
+    """
+    Stops the lease recovery and the worker pool without waiting, leaving unfinished jobs to be resumed when their lease expires
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _executor, _reaper
+    _reaper_stop.set()
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        _reaper = None
+        _pending_jobs.clear()
@@ -0,0 +1,264 @@
+"""
+The module comprises of the BM25 lexical index over the extracted question-answer pairs and the reciprocal rank fusion used for hybrid retrieval.
+"""
+
+import os
+import re
+import math
+import time
+import logging
+import threading
+from collections import Counter
+from services.qa_catalog import load_qa_entries
+from services.ingestion_catalog import ingestion_catalog
+
+logger = logging.getLogger("faq-qa-bot")
+lexical_min_score = float(os.getenv("LEXICAL_MIN_SCORE", 8.0))
+lexical_min_ratio = float(os.getenv("LEXICAL_MIN_RATIO", 1.5))
+_token_pattern = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+_stopwords = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its my of on or our should that "
+    "the their there this to was what when where which who why will with would you your".split()
+)
+
+
+def tokenize(text: str)-> list:
+    """
+    Splits text into lowercase terms, keeping identifiers such as "800-60" and "2.0" whole
+
+    Parameters
+    ----------
+    text: str
+        The text to be tokenized
+
+    Returns
+    -------
+    list
+        The terms without stopwords
+
+    """
+
+
+    return [token for token in _token_pattern.findall(text.lower()) if token not in _stopwords]
+
+
+class LexicalIndex:
+    """
+    An Okapi BM25 inverted index over the stored question-answer pairs with the question counted twice
+
+    """
+
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Creates an empty index
+
+        Parameters
+        ----------
+        k1: float
+            The BM25 term frequency saturation
+
+        b: float
+            The BM25 document length normalization
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.k1 = k1
+        self.b = b
+        self._state = None
+        self._generation = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self)-> None:
+        """
+        Rebuilds the index from the extracted question-answer pairs
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        build_start = time.perf_counter()
+        generation = ingestion_catalog.generation()
+        entries = load_qa_entries()
+        postings = {}
+        lengths = []
+        for position, entry in enumerate(entries):
+            terms = Counter(tokenize(entry["question"]) * 2 + tokenize(entry["answer"]))
+            lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                postings.setdefault(term, []).append((position, frequency))
+        average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        idf = {
+            term: math.log(1 + (len(entries) - len(documents) + 0.5) / (len(documents) + 0.5))
+            for term, documents in postings.items()
+        }
+        with self._lock:
+            self._state = (entries, postings, idf, lengths, average_length)
+            self._generation = generation
+        build_time = time.perf_counter() - build_start
+        logger.info("Lexical index built | Documents = %d | Terms = %d | Generation = %d | Time = %.3fs", len(entries), len(postings), generation, build_time)
+
+    def load(self)-> None:
+        """
+        Builds the index on first use and rebuilds it in the background once the corpus generation changes, e.g. in a worker forked with an older preloaded index
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        generation = ingestion_catalog.generation()
+        if self._state is not None and self._generation == generation:
+            return
+        if self._state is None:
+            with self._refresh_lock:
+                if self._state is None:
+                    self.refresh()
+            return
+        #Rebuilding in a background thread while lookups on the event loop keep using the previous index until it is swapped
+        if self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, args=(generation,), name="lexical-index-refresh", daemon=True).start()
+
+    def _refresh_in_background(self, generation: int)-> None:
+        """
+        Rebuilds the index for a newer corpus generation and releases the refresh lock taken by load
+
+        Parameters
+        ----------
+        generation: int
+            The corpus generation seen by load
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        try:
+            if self._generation != generation:
+                self.refresh()
+        except Exception:
+            logger.exception("Index rebuild failed | Index = lexical")
+        finally:
+            self._refresh_lock.release()
+
+    def search(self, query: str, k: int = 5)-> list:
+        """
+        Returns the k highest scoring question-answer pairs for the query
+
+        Parameters
+        ----------
+        query: str
+            The query sent by the user
+
+        k: int
+            The number of results
+
+        Returns
+        -------
+        list
+            The documents in the format returned by retrieve_similar_docs with their BM25 score
+
+        """
+
+
+        self.load()
+        entries, postings, idf, lengths, average_length = self._state
+        scores = {}
+        for term in set(tokenize(query)):
+            for position, frequency in postings.get(term, []):
+                length_norm = 1 - self.b + self.b * lengths[position] / average_length
+                term_score = idf[term] * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                scores[position] = scores.get(position, 0.0) + term_score
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            {
+                "content": entries[position]["content"],
+                "file_name": entries[position]["file_name"],
+                "page_number": entries[position]["page_number"],
+                "refined_answer": entries[position]["refined_answer"],
+                "similarity_score": score,
+                "retrieval_method": "lexical"
+            }
+            for position, score in ranked
+        ]
+
+    def is_confident(self, results: list)-> bool:
+        """
+        Decides whether the lexical top hit is strong enough to be served without dense retrieval
+
+        Parameters
+        ----------
+        results: list
+            The ranked lexical results
+
+        Returns
+        -------
+        bool
+            True when the top score reaches LEXICAL_MIN_SCORE and leads the runner-up by LEXICAL_MIN_RATIO
+
+        """
+
+
+        if not results or results[0]["similarity_score"] < lexical_min_score:
+            return False
+        if len(results) == 1:
+            return True
+        return results[0]["similarity_score"] >= lexical_min_ratio * results[1]["similarity_score"]
+
+
+def reciprocal_rank_fusion(ranked_lists: list, k: int = 60)-> list:
+    """
+    Fuses ranked document lists with reciprocal rank fusion
+
+    Parameters
+    ----------
+    ranked_lists: list
+        The ranked lists of documents, best first
+
+    k: int
+        The rank smoothing constant
+
+    Returns
+    -------
+    list
+        The fused documents, best first, keeping the dense similarity score when a document has one
+
+    """
+
+
+    fused_scores = {}
+    fused_docs = {}
+    for ranked_docs in ranked_lists:
+        for rank, doc in enumerate(ranked_docs):
+            key = (doc["file_name"], doc["page_number"], doc["content"])
+            fused_scores[key] = fused_scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            if key not in fused_docs or doc.get("retrieval_method") == "dense":
+                fused_docs[key] = doc
+
+    ranked_keys = sorted(fused_scores, key=fused_scores.get, reverse=True)
+    return [dict(fused_docs[key], retrieval_method="hybrid", fusion_score=fused_scores[key]) for key in ranked_keys]
+
+
+lexical_index = LexicalIndex()
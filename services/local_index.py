@@ -0,0 +1,461 @@
+"""
+The module comprises of the local in-process vector index used as an alternative to the Pinecone Vector Database.
+"""
+
+import os
+import sys
+import asyncio
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+import numpy as np
+from collections import Counter
+from contextlib import contextmanager
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger("faq-qa-bot")
+local_index_dir = os.getenv("LOCAL_INDEX_DIR", "./vector_index")
+local_index_ann = os.getenv("LOCAL_INDEX_ANN", "false").lower() == "true"
+local_index_ann_min_size = int(os.getenv("LOCAL_INDEX_ANN_MIN_SIZE", 20000))
+search_batch_size = 65536
+
+
+class LocalVectorIndex:
+    """
+    A persisted float32 embedding matrix with metadata searched by exact cosine similarity, with an optional HNSW graph for larger corpora, published as atomic versions safe to write from several processes
+
+    """
+
+
+    def __init__(self, directory: str, embedding: Embeddings | None, ann: bool = False, ann_min_size: int = 20000, generation: callable = None):
+        """
+        Creates the index without loading it from disk
+
+        Parameters
+        ----------
+        directory: str
+            The directory holding the embedding matrix and metadata
+
+        embedding: Embeddings | None
+            The embeddings used for queries and stored texts, or None until they are attached to a preloaded index
+
+        ann: bool
+            Whether to use an approximate HNSW graph when hnswlib is installed
+
+        ann_min_size: int
+            The number of vectors from which the approximate graph is used
+
+        generation: callable
+            Returns the corpus generation, so the index is reloaded after another process stores texts. None loads the index once
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.directory = directory
+        self.embeddings = embedding
+        self.ann = ann
+        self.ann_min_size = ann_min_size
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.generation = generation
+        self._state = None
+        self._state_generation = None
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """
+        Holds the lock file of the index, exclusively while the index is written and shared while it is read, so worker processes never see a partial write
+
+        Parameters
+        ----------
+        exclusive: bool
+            Whether to take the lock exclusively
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a+") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current_version(self)-> str | None:
+        """
+        Returns the directory of the published version of the index, reading it from the manifest
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        str | None
+            The version directory, the index directory for an index written before versions were published, or None for an empty index
+
+        """
+
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as manifest_file:
+                return os.path.join(self.directory, json.load(manifest_file)["version"])
+        if os.path.exists(os.path.join(self.directory, "embeddings.npy")):
+            return self.directory
+        return None
+
+    def _read(self, version_directory: str | None)-> tuple:
+        """
+        Memory-maps the embedding matrix and loads the metadata of a version
+
+        Parameters
+        ----------
+        version_directory: str | None
+            The version directory, or None for an empty index
+
+        Returns
+        -------
+        tuple
+            The embedding matrix and the metadata records
+
+        """
+
+
+        if version_directory is None:
+            return np.zeros((0, 0), dtype=np.float32), []
+        matrix = np.load(os.path.join(version_directory, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(version_directory, "metadata.json"), "r", encoding="utf-8") as metadata_file:
+            records = json.load(metadata_file)
+        return matrix, records
+
+    def _publish(self, matrix: np.ndarray, records: list)-> None:
+        """
+        Writes the matrix and metadata into a new version directory and switches the manifest to it in one rename, then removes the previous versions
+
+        Parameters
+        ----------
+        matrix: np.ndarray
+            The normalized embedding matrix
+
+        records: list
+            The metadata records
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        version = f"v{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        version_directory = os.path.join(self.directory, version)
+        os.makedirs(version_directory)
+        np.save(os.path.join(version_directory, "embeddings.npy"), matrix)
+        with open(os.path.join(version_directory, "metadata.json"), "w", encoding="utf-8") as metadata_file:
+            json.dump(records, metadata_file, ensure_ascii=False)
+        with open(self.manifest_path + ".tmp", "w", encoding="utf-8") as manifest_file:
+            json.dump({"version": version, "vectors": len(records)}, manifest_file)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
+        #Readers hold the shared lock until their files are open, and memory-mapped files stay readable after removal
+        for entry in os.listdir(self.directory):
+            if entry.startswith("v") and entry != version and os.path.isdir(os.path.join(self.directory, entry)):
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+        for file_name in ("embeddings.npy", "metadata.json", "hnsw.bin"):
+            if os.path.exists(os.path.join(self.directory, file_name)):
+                os.remove(os.path.join(self.directory, file_name))
+
+    def load(self)-> tuple:
+        """
+        Memory-maps the published embedding matrix and loads its metadata on first use and after the corpus generation changes
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        tuple
+            The embedding matrix, the metadata records, and the HNSW graph or None
+
+        """
+
+
+        generation = self.generation() if self.generation is not None else None
+        state = self._state
+        if state is not None and self._state_generation == generation:
+            return state
+        with self._lock:
+            if self._state is not None and self._state_generation == generation:
+                return self._state
+            load_start = time.perf_counter()
+            with self._file_lock(exclusive=False):
+                version_directory = self._current_version()
+                matrix, records = self._read(version_directory)
+            graph = self._load_graph(matrix, version_directory)
+            self._state = (matrix, records, graph)
+            self._state_generation = generation
+            load_time = time.perf_counter() - load_start
+            logger.info("Local vector index loaded | Vectors = %d | ANN = %s | Time = %.3fs", len(records), graph is not None, load_time)
+            return self._state
+
+    def _load_graph(self, matrix: np.ndarray, version_directory: str | None):
+        """
+        Loads or builds the HNSW graph of a version when it is enabled and the corpus is large enough, building it in one process at a time
+
+        Parameters
+        ----------
+        matrix: np.ndarray
+            The normalized embedding matrix
+
+        version_directory: str | None
+            The version directory the matrix was read from
+
+        Returns
+        -------
+        hnswlib.Index | None
+            The graph, or None when exact search is used
+
+        """
+
+
+        if not self.ann or hnswlib is None or matrix.shape[0] < self.ann_min_size:
+            return None
+        graph = hnswlib.Index(space="cosine", dim=matrix.shape[1])
+        graph_path = os.path.join(version_directory, "hnsw.bin")
+        with self._file_lock(exclusive=True):
+            if os.path.exists(graph_path):
+                graph.load_index(graph_path, max_elements=matrix.shape[0])
+            else:
+                graph.init_index(max_elements=matrix.shape[0], ef_construction=200, M=16)
+                graph.add_items(np.asarray(matrix), np.arange(matrix.shape[0]))
+                #A version replaced while the graph was built keeps its graph in memory only
+                if os.path.isdir(version_directory):
+                    graph.save_index(graph_path + ".tmp")
+                    os.replace(graph_path + ".tmp", graph_path)
+        graph.set_ef(64)
+        return graph
+
+    def count(self)-> int:
+        """
+        Returns the number of stored vectors
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        int
+
+        """
+
+
+        return len(self.load()[1])
+
+    def add_texts(self, texts: list, metadatas: list | None = None, ids: list | None = None)-> list:
+        """
+        Embeds the texts and publishes a new version of the index with them, replacing the stored vectors with the same IDs
+
+        Parameters
+        ----------
+        texts: list
+            The texts to be stored
+
+        metadatas: list | None
+            The metadata of each text
+
+        ids: list | None
+            The ID of each text. Defaults to random IDs
+
+        Returns
+        -------
+        list
+            The IDs of the stored vectors
+
+        """
+
+
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if ids is None:
+            ids = [uuid.uuid4().hex for _ in texts]
+        with self._lock, self._file_lock(exclusive=True):
+            #Reading the published version under the lock so the vectors stored by another process are kept
+            matrix, records = self._read(self._current_version())
+            matrix = np.asarray(matrix) if matrix.size else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+            replaced = set(ids)
+            kept = [position for position, record in enumerate(records) if record.get("id") not in replaced]
+            new_matrix = np.vstack([matrix[kept], vectors])
+            new_records = [records[position] for position in kept] + [{"id": vector_id, "text": text, "metadata": metadata} for vector_id, text, metadata in zip(ids, texts, metadatas)]
+            self._publish(new_matrix, new_records)
+            self._state = None
+        self.load()
+        return list(ids)
+
+    def similarity_search_by_vector_with_score(self, embedding: list, k: int = 4)-> list:
+        """
+        Returns the k stored texts with the highest cosine similarity to the embedding
+
+        Parameters
+        ----------
+        embedding: list
+            The query embedding
+
+        k: int
+            The number of results
+
+        Returns
+        -------
+        list
+            The (Document, score) pairs ordered by decreasing similarity
+
+        """
+
+
+        matrix, records, graph = self.load()
+        if not records:
+            return []
+        query = np.array(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        k = min(k, len(records))
+
+        if graph is not None:
+            labels, distances = graph.knn_query(query, k=k)
+            positions, scores = labels[0], 1.0 - distances[0]
+        else:
+            scores = np.empty(len(records), dtype=np.float32)
+            for batch_start in range(0, len(records), search_batch_size):
+                batch_end = batch_start + search_batch_size
+                scores[batch_start:batch_end] = matrix[batch_start:batch_end] @ query
+            positions = np.argpartition(-scores, k - 1)[:k]
+            positions = positions[np.argsort(-scores[positions])]
+            scores = scores[positions]
+
+        return [
+            (Document(page_content=records[position]["text"], metadata=records[position]["metadata"]), float(score))
+            for position, score in zip(positions, scores)
+        ]
+
+    async def asimilarity_search_by_vector_with_score(self, embedding: list, k: int = 4)-> list:
+        """
+        Returns the k stored texts with the highest cosine similarity to the embedding from async code
+
+        Parameters
+        ----------
+        embedding: list
+            The query embedding
+
+        k: int
+            The number of results
+
+        Returns
+        -------
+        list
+            The (Document, score) pairs ordered by decreasing similarity
+
+        """
+
+
+        #Scanning the matrix and reloading a newer version in a worker thread so the event loop keeps serving other requests
+        return await asyncio.to_thread(self.similarity_search_by_vector_with_score, embedding, k)
+
+    def similarity_search_with_score(self, query: str, k: int = 4)-> list:
+        """
+        Embeds the query and returns the k most similar stored texts
+
+        Parameters
+        ----------
+        query: str
+            The query sent by the user
+
+        k: int
+            The number of results
+
+        Returns
+        -------
+        list
+            The (Document, score) pairs ordered by decreasing similarity
+
+        """
+
+
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k=k)
+
+
+def build_from_catalog(index: LocalVectorIndex)-> int:
+    """
+    Embeds every extracted question-answer pair into an empty local index
+
+    Parameters
+    ----------
+    index: LocalVectorIndex
+        The local index to be populated
+
+    Returns
+    -------
+    int
+        The number of stored vectors
+
+    """
+
+
+    from services.qa_catalog import load_qa_entries
+    from services.ingestion_catalog import ingestion_catalog
+
+    if index.count() > 0:
+        logger.warning("Local vector index is not empty | Vectors = %d", index.count())
+        return index.count()
+    ingestion_catalog.backfill_content_hashes()
+    entries = load_qa_entries()
+    #Numbering the pairs of every document like store_embeddings, so ingesting a built document again replaces its vectors
+    positions = Counter()
+    ids = []
+    for entry in entries:
+        vector_prefix = entry["content_hash"] or entry["file_name"]
+        ids.append(f"{vector_prefix}-{positions[vector_prefix]}")
+        positions[vector_prefix] += 1
+    index.add_texts(
+        [entry["content"] for entry in entries],
+        [{"file_name": entry["file_name"], "page_number": entry["page_number"], **({"refined_answer": entry["refined_answer"]} if entry["refined_answer"] else {}), **({"content_hash": entry["content_hash"]} if entry["content_hash"] else {})} for entry in entries],
+        ids=ids
+        )
+    return index.count()
+
+
+if __name__ == "__main__":
+    from core.logging_config import setup_logging
+    from services.vector_store import get_embeddings
+
+    setup_logging()
+    if sys.argv[1:] != ["build"]:
+        print("Usage: python -m services.local_index build")
+        sys.exit(1)
+    stored = build_from_catalog(LocalVectorIndex(local_index_dir, get_embeddings(), local_index_ann, local_index_ann_min_size))
+    print("Vectors: ", stored)
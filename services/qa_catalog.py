@@ -0,0 +1,67 @@
+"""
+The module comprises of the loader for the question-answer pairs extracted from the ingested PDFs.
+"""
+
+import os
+import csv
+import logging
+from core.metrics import stage_timer
+from services.ingestion_catalog import ingestion_catalog
+
+logger = logging.getLogger("faq-qa-bot")
+
+
+def load_qa_entries()-> list:
+    """
+    Loads the extracted question-answer pairs of every PDF whose embeddings have been created
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    list
+        The question-answer entries with their file name, page number, content hash, and stored content
+
+    """
+
+
+    with stage_timer("catalog_io"):
+        return _read_qa_entries()
+
+
+def _read_qa_entries()-> list:
+    """
+    Reads the ingestion catalog and the question-answer CSV files
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    list
+        The question-answer entries
+
+    """
+
+
+    entries = []
+    for document in ingestion_catalog.list_documents(embedded_only=True):
+        csv_path = document.get("questions_answers_extracted")
+        if not csv_path or not os.path.exists(csv_path):
+            continue
+        file_name = os.path.basename(document["uploaded_pdf_link"])
+        with open(csv_path, mode="r", newline="", encoding="utf-8") as qa_file:
+            for row in csv.DictReader(qa_file):
+                entries.append({
+                    "question": row["question"],
+                    "answer": row["answer"],
+                    "content": f"{row['question']}\n{row['answer']}",
+                    "file_name": file_name,
+                    "page_number": int(row["page_number"]),
+                    "refined_answer": row.get("refined_answer") or "",
+                    "content_hash": document.get("content_hash") or ""
+                })
+    return entries
@@ -0,0 +1,375 @@
+"""
+The module comprises of the in-memory index of the extracted questions used to answer verbatim and near-verbatim queries without a vector search.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from core.cache import LRUCache
+from core.normalization import normalize_query
+from services.qa_catalog import load_qa_entries
+from services.ingestion_catalog import ingestion_catalog
+
+logger = logging.getLogger("faq-qa-bot")
+question_index_enabled = os.getenv("QUESTION_INDEX", "true").lower() == "true"
+question_index_fuzzy_cutoff = float(os.getenv("QUESTION_INDEX_FUZZY_CUTOFF", 0.92))
+question_index_fuzzy_margin = int(os.getenv("QUESTION_INDEX_FUZZY_MARGIN", 2))
+question_index_candidate_words = 3
+question_index_lookup_cache_size = int(os.getenv("QUESTION_INDEX_LOOKUP_CACHE_SIZE", 4096))
+_numbering_pattern = re.compile(r"^(?:q(?:uestion)?\s*)?\d+(?:\s*[.):\-]\s*|\s+)")
+
+
+def word_typo_budget(word: str)-> int:
+    """
+    Returns the number of typos tolerated in a word, none in short words and numbers whose edits change their meaning
+
+    Parameters
+    ----------
+    word: str
+        The stored word
+
+    Returns
+    -------
+    int
+        The maximum edit distance
+
+    """
+
+
+    if len(word) <= 3 or any(character.isdigit() for character in word):
+        return 0
+    return 1 if len(word) <= 7 else 2
+
+
+def edit_distance(first: str, second: str, limit: int)-> int:
+    """
+    Computes the Levenshtein distance of two words, stopping once it exceeds the limit
+
+    Parameters
+    ----------
+    first: str
+        The first word
+
+    second: str
+        The second word
+
+    limit: int
+        The largest distance of interest
+
+    Returns
+    -------
+    int
+        The distance, or limit + 1 if it is larger than the limit
+
+    """
+
+
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous = list(range(len(second) + 1))
+    for row, first_character in enumerate(first, 1):
+        current = [row]
+        for column, second_character in enumerate(second, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + (first_character != second_character)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+def token_edit_distance(query_words: list, stored_words: list, limit: int)-> int | None:
+    """
+    Returns the number of typos separating a query from a stored question word by word, so a word replaced by another word never matches
+
+    Parameters
+    ----------
+    query_words: list
+        The words of the normalized query
+
+    stored_words: list
+        The words of the normalized stored question
+
+    limit: int
+        The largest total number of typos accepted
+
+    Returns
+    -------
+    int | None
+        The total edit distance, or None if a word is not a typo of the stored word or the total exceeds the limit
+
+    """
+
+
+    if len(query_words) != len(stored_words):
+        return None
+    total = 0
+    for query_word, stored_word in zip(query_words, stored_words):
+        if query_word == stored_word:
+            continue
+        budget = word_typo_budget(stored_word)
+        #A typo rarely changes the first letter, while a different word such as another edition name usually does
+        if budget == 0 or query_word[0] != stored_word[0]:
+            return None
+        distance = edit_distance(query_word, stored_word, budget)
+        if distance > budget:
+            return None
+        total += distance
+        if total > limit:
+            return None
+    return total
+
+
+def normalize_question(text: str)-> str:
+    """
+    Normalizes a question and strips leading numbering such as "Q12." or "3."
+
+    Parameters
+    ----------
+    text: str
+        The question
+
+    Returns
+    -------
+    str
+        The normalized question
+
+    """
+
+
+    return _numbering_pattern.sub("", normalize_query(text), count=1)
+
+
+class QuestionIndex:
+    """
+    Maps normalized questions to their question-answer entries with a fallback tolerating a few typos within the words of a stored question
+
+    """
+
+
+    def __init__(self, fuzzy_cutoff: float):
+        """
+        Creates an empty index
+
+        Parameters
+        ----------
+        fuzzy_cutoff: float
+            The minimum similarity ratio accepted by the fuzzy match
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._entries = None
+        self._token_index = {}
+        self._lookup_cache = LRUCache(question_index_lookup_cache_size)
+        self._generation = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self)-> None:
+        """
+        Rebuilds the index from the extracted question-answer pairs
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        build_start = time.perf_counter()
+        generation = ingestion_catalog.generation()
+        entries = {}
+        token_index = {}
+        for entry in load_qa_entries():
+            key = normalize_question(entry["question"])
+            if key and key not in entries:
+                entries[key] = entry
+                for token in set(key.split()):
+                    token_index.setdefault(token, []).append(key)
+        with self._lock:
+            self._entries = entries
+            self._token_index = token_index
+            self._lookup_cache = LRUCache(question_index_lookup_cache_size)
+            self._generation = generation
+        build_time = time.perf_counter() - build_start
+        logger.info("Question index built | Questions = %d | Generation = %d | Time = %.3fs", len(entries), generation, build_time)
+
+    def load(self)-> None:
+        """
+        Builds the index on first use and rebuilds it in the background once the corpus generation changes, e.g. in a worker forked with an older preloaded index
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        generation = ingestion_catalog.generation()
+        if self._entries is not None and self._generation == generation:
+            return
+        if self._entries is None:
+            with self._refresh_lock:
+                if self._entries is None:
+                    self.refresh()
+            return
+        #Rebuilding in a background thread while lookups on the event loop keep using the previous index until it is swapped
+        if self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, args=(generation,), name="question-index-refresh", daemon=True).start()
+
+    def _refresh_in_background(self, generation: int)-> None:
+        """
+        Rebuilds the index for a newer corpus generation and releases the refresh lock taken by load
+
+        Parameters
+        ----------
+        generation: int
+            The corpus generation seen by load
+
+        Returns
+        -------
+        None
+
+        """
+
+
+        try:
+            if self._generation != generation:
+                self.refresh()
+        except Exception:
+            logger.exception("Index rebuild failed | Index = question")
+        finally:
+            self._refresh_lock.release()
+
+    def _fuzzy_candidates(self, key: str, token_index: dict)-> list:
+        """
+        Returns the stored questions sharing one of the rarest words of the key with as many words as the key and a length within the typo budget
+
+        Parameters
+        ----------
+        key: str
+            The normalized query
+
+        token_index: dict
+            The stored questions by word
+
+        Returns
+        -------
+        list
+            The candidate questions in index order
+
+        """
+
+
+        #Every edit changes the length by at most one character, so longer or shorter questions cannot fit the typo budget
+        max_edits = int(len(key) * (1 - self.fuzzy_cutoff))
+        words = key.count(" ")
+        #Questions within the budget share most words with the query, so the rarest stored words of the query are enough to find them
+        postings = sorted((token_index[token] for token in set(key.split()) if token in token_index), key=len)
+        candidates = {}
+        for posting in postings[:question_index_candidate_words]:
+            for candidate in posting:
+                if abs(len(candidate) - len(key)) <= max_edits and candidate.count(" ") == words:
+                    candidates[candidate] = None
+        return list(candidates)
+
+    def _match(self, key: str, entries: dict, token_index: dict)-> tuple:
+        """
+        Finds the stored question matching the normalized query exactly or with a few typos in its words, rejecting a query that is as close to another stored question
+
+        Parameters
+        ----------
+        key: str
+            The normalized query
+
+        entries: dict
+            The stored entries by normalized question
+
+        token_index: dict
+            The stored questions by word
+
+        Returns
+        -------
+        tuple
+            The matching stored question and its similarity ratio, or None and 0.0
+
+        """
+
+
+        if key in entries:
+            return key, 1.0
+        max_edits = int(len(key) * (1 - self.fuzzy_cutoff))
+        words = key.split()
+        matches = []
+        for candidate in self._fuzzy_candidates(key, token_index):
+            edits = token_edit_distance(words, candidate.split(), max_edits)
+            if edits is not None:
+                matches.append((edits, candidate))
+        if not matches:
+            return None, 0.0
+        matches.sort()
+        edits, candidate = matches[0]
+        #Two stored questions within the typo budget of the query are ambiguous, e.g. the same question about two editions
+        if len(matches) > 1 and matches[1][0] - edits < question_index_fuzzy_margin:
+            return None, 0.0
+        return candidate, 1.0 - edits / len(key)
+
+    def lookup(self, query: str)-> dict | None:
+        """
+        Finds the stored question matching the query exactly or with a few typos
+
+        Parameters
+        ----------
+        query: str
+            The query sent by the user
+
+        Returns
+        -------
+        dict | None
+            The matching document in the format returned by retrieve_similar_docs, or None
+
+        """
+
+
+        self.load()
+        with self._lock:
+            entries, token_index, lookup_cache = self._entries, self._token_index, self._lookup_cache
+        key = normalize_question(query)
+        if not key:
+            return None
+
+        #Caching the match per query so the batch path and retrieval do not repeat the fuzzy search
+        match = lookup_cache.get(key)
+        if match is None:
+            match = self._match(key, entries, token_index)
+            lookup_cache.set(key, match)
+        matched_key, score = match
+        if matched_key is None:
+            return None
+        entry = entries[matched_key]
+        return {
+            "content": entry["content"],
+            "file_name": entry["file_name"],
+            "page_number": entry["page_number"],
+            "refined_answer": entry["refined_answer"],
+            "similarity_score": score,
+            "retrieval_method": "question_index"
+        }
+
+
+question_index = QuestionIndex(fuzzy_cutoff=question_index_fuzzy_cutoff)
@@ -3,41 +3,131 @@ The module comprises of the retrieval tool and answer refinement tool.
 """
 
 import os
+import asyncio
 import logging 
+import threading
 import time
-import langchain
-from langchain_openai import OpenAIEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
 from pinecone.exceptions import PineconeException, PineconeApiException
 from openai import OpenAIError, APIStatusError
-from langchain.messages import SystemMessage, HumanMessage
 from dotenv import load_dotenv, find_dotenv
+from core.pipeline_loop import run_sync, iterate_sync
+from core.normalization import normalize_query
+from core.singleflight import SingleFlight
+from core.metrics import stage_timer, observe_stage
+from core.tracing import span, record_span, set_attribute
+from services.vector_store import aget_vectorstore, get_embeddings, vector_backend, index_name
+from services.answer_cache import answer_cache, answer_cache_key
+from services.question_index import question_index, question_index_enabled
+from services.lexical_index import lexical_index, reciprocal_rank_fusion
+from services.score_gate import get_thresholds, passes_score_gate
 
 _ = load_dotenv(find_dotenv())
-openai_api_key = os.getenv("OPENAI_API_KEY")
 gemini_api_key = os.getenv("GOOGLE_API_KEY")
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-index_name = "faqsampleindexjuly2026"
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=openai_api_key)
-gemini_flash_llm = ChatGoogleGenerativeAI(model="gemini-3.1-flash-lite", temperature=1.0, max_retries=2, thinking_level="high", include_thoughts=False, top_p=0.05)
+answer_mode = os.getenv("ANSWER_MODE", "live")
+retrieval_mode = os.getenv("RETRIEVAL_MODE", "dense")
+batch_refinement_concurrency = int(os.getenv("BATCH_REFINEMENT_CONCURRENCY", 8))
+retrieval_flight = SingleFlight(timeout=float(os.getenv("RETRIEVAL_COALESCE_TIMEOUT", 30)))
+refinement_flight = SingleFlight(timeout=float(os.getenv("REFINEMENT_COALESCE_TIMEOUT", 60)))
+hybrid_k = int(os.getenv("HYBRID_K", 5))
+score_gate_key = index_name if vector_backend == "pinecone" else vector_backend
 logger = logging.getLogger("faq-qa-bot")
+_gemini_lock = threading.Lock()
+_gemini_flash_llm = None
+prompt_version = "1"
+system_message_content = """
+        <role>
+        You are a Text Assistant.
+        </role>
+        <task>
+        Your task is to extract the answer ONLY from the given text and edit the answer as per the following instructions while preserving its exact structural identity.
+        </task>
 
+        <instructions>
+        1. Only the answer from the given text is to be edited for output and not the question.
+        2. Fix spelling mistakes and mathematical equations only.
+        3. Remove non-text noise found exclusively at the absolute end of the input.
+        4. Do not add extra blank lines between bullet points.
+        5. Do not add extra commas or semicolons where they are not present in the answer.
+        6. Combine split elements ONLY if they were accidentally broken mid-sentence.
+
+        PRESERVATION RULES (DO NOT MODIFY):
+        1. Word Choice: Never add, swap, or delete existing words.
+        2. Paragraphs: Keep existing boundaries. Do not merge or split paragraphs.
+        3. Sentences: Keep existing boundaries. Do not break or arbitrarily merge sentences.
+        4. Punctuation: Retain all existing commas and semicolons exactly where they are.
+
+        OUTPUT FORMAT:
+        Output only the finalized and edited answer in text. Do not provide introductions, explanations, the question, or meta-commentary.
+        If zero changes are required, output the original answer in the text exactly as it is.
+        </instructions>
+        """
+
+
+def get_gemini_llm()-> ChatGoogleGenerativeAI:
+    """
+    Returns the process-wide Gemini client, creating it on first use
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    ChatGoogleGenerativeAI
+        The shared Gemini Flash client
 
-def retrieve_similar_docs(query: str)-> list:
     """
-    Retrieves the question-answer pair with the highest similarity to the query sent by the user from the Pinecone Vector Database
+
+
+    global _gemini_flash_llm
+    if _gemini_flash_llm is not None:
+        return _gemini_flash_llm
+
+    with _gemini_lock:
+        if _gemini_flash_llm is None:
+            _gemini_flash_llm = ChatGoogleGenerativeAI(model="gemini-3.1-flash-lite", temperature=1.0, max_retries=2, thinking_level="high", include_thoughts=False, top_p=0.05)
+    return _gemini_flash_llm
+
+
+def warm_up_gemini()-> bool:
+    """
+    Creates the shared Gemini client before traffic arrives
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        The state of the warm-up
+
+    """
+
+
+    return get_gemini_llm() is not None
+
+
+async def adense_search(query: str, k: int = 1, query_embedding: list | None = None)-> list:
+    """
+    Retrieves the question-answer pairs with the highest embedding similarity to the query from the configured vector store asynchronously
 
     Parameters
     ----------
     query: str
         The query sent by the user
 
+    k: int
+        The number of documents to retrieve
+
+    query_embedding: list | None
+        The embedding of the query when it was already computed in bulk
+
     Returns
     -------
     list
-        The documents with the highest similarity
+        The documents with the highest similarity, or an error string
     
     """
 
@@ -45,14 +135,20 @@ def retrieve_similar_docs(query: str)-> list:
     retrieval_start = time.perf_counter()
     try:
         logger.info("Starting OpenAI embedding generation")
-        vectorstore = PineconeVectorStore(index_name=index_name, embedding=embeddings)
+        vectorstore = await aget_vectorstore()
+        if query_embedding is None:
+            query_embedding = await get_embeddings().aembed_query(query)
         logger.info("OpenAI embedding generated")
-        logger.info("Starting Pinecone similarity search")
-        similar_docs = vectorstore.similarity_search_with_score(query, k=1)
+        logger.info("Starting %s similarity search", vector_backend)
+        with stage_timer("vector_search", k=k, backend=vector_backend):
+            similar_docs = await vectorstore.asimilarity_search_by_vector_with_score(query_embedding, k=k)
+            set_attribute("results", len(similar_docs))
+            if similar_docs:
+                set_attribute("top_score", float(similar_docs[0][1]))
         retrieval_time = time.perf_counter() - retrieval_start
-        logger.info("Pinecone similarity search completed | k = %d | Time = %.3fs", 1, retrieval_time)
+        logger.info("%s similarity search completed | k = %d | Time = %.3fs", vector_backend, k, retrieval_time)
 
-        if similar_docs == None:
+        if not similar_docs:
             return "No similar docs."
 
         similar_docs_list = []
@@ -61,7 +157,9 @@ def retrieve_similar_docs(query: str)-> list:
                 "content": doc.page_content,
                 "file_name": doc.metadata.get("file_name", "Unknown"),
                 "page_number": int(doc.metadata.get("page_number", "Unknown")),
-                "similarity_score": score
+                "refined_answer": doc.metadata.get("refined_answer", ""),
+                "similarity_score": score,
+                "retrieval_method": "dense"
             }
             similar_docs_list.append(doc_info)
         
@@ -83,25 +181,193 @@ def retrieve_similar_docs(query: str)-> list:
         return f"Connection-{str(e)}"
 
 
-def refine_answer(query: str)-> dict:
+async def aretrieve_similar_docs(query: str, mode: str | None = None, query_embedding: list | None = None)-> list:
+    """
+    Retrieves the question-answer pair with the highest similarity to the query sent by the user asynchronously
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "dense", "lexical", or "hybrid". Defaults to RETRIEVAL_MODE
+
+    query_embedding: list | None
+        The embedding of the query when it was already computed in bulk
+
+    Returns
+    -------
+    list
+        The documents with the highest similarity, or an error string. "Low similarity." when the dense score is below the calibrated threshold
+    
+    """
+
+
+    retrieval_start = time.perf_counter()
+    mode = mode or retrieval_mode
+    if(question_index_enabled == True):
+        indexed_doc = question_index.lookup(query)
+        if indexed_doc is not None:
+            retrieval_time = time.perf_counter() - retrieval_start
+            logger.info("Question index match | Score = %.3f | Time = %.3fs", indexed_doc["similarity_score"], retrieval_time)
+            return [indexed_doc]
+
+    if(mode == "dense"):
+        dense_k = 1 if get_thresholds(score_gate_key)["min_margin"] is None else 2
+        dense_docs = await adense_search(query, k=dense_k, query_embedding=query_embedding)
+        if(isinstance(dense_docs, str)):
+            return dense_docs
+        if not passes_score_gate(dense_docs, score_gate_key):
+            return "Low similarity."
+        return dense_docs[:1]
+
+    lexical_docs = lexical_index.search(query, k=hybrid_k)
+    if(mode == "lexical" or lexical_index.is_confident(lexical_docs)):
+        retrieval_time = time.perf_counter() - retrieval_start
+        logger.info("Lexical search completed | Mode = %s | Results = %d | Time = %.3fs", mode, len(lexical_docs), retrieval_time)
+        if not lexical_docs:
+            return "No similar docs."
+        return lexical_docs[:1]
+
+    dense_docs = await adense_search(query, k=hybrid_k, query_embedding=query_embedding)
+    if(isinstance(dense_docs, str)):
+        if dense_docs != "No similar docs." and lexical_docs:
+            logger.warning("Dense retrieval failed, serving the lexical result")
+            return lexical_docs[:1]
+        return dense_docs
+    if not passes_score_gate(dense_docs, score_gate_key):
+        return "Low similarity."
+
+    fused_docs = reciprocal_rank_fusion([dense_docs, lexical_docs])
+    retrieval_time = time.perf_counter() - retrieval_start
+    logger.info("Hybrid retrieval completed | k = %d | Time = %.3fs", hybrid_k, retrieval_time)
+    return fused_docs[:1]
+
+
+async def agenerate_refined_answer(content: str)-> str:
+    """
+    Sends the retrieved question-answer pair to Gemini asynchronously and returns the refined answer
+
+    Parameters
+    ----------
+    content: str
+        The retrieved question-answer pair
+
+    Returns
+    -------
+    str
+        The refined answer, or an empty string if Gemini returned no content
+
     """
-    Refines the answer retrieved from the Vector Database and generates the final answer
+
+
+    messages = [
+        ("system", system_message_content),
+        ("human", content)
+        ]
+    logger.info("Sending request to Gemini LLM")
+    gemini_start = time.perf_counter()
+    with stage_timer("llm_refinement"):
+        response = await get_gemini_llm().ainvoke(messages)
+        usage = getattr(response, "usage_metadata", None) or {}
+        set_attribute("input_tokens", usage.get("input_tokens"))
+        set_attribute("output_tokens", usage.get("output_tokens"))
+    gemini_time = time.perf_counter() - gemini_start
+    logger.info("Gemini execution completed successfully | Time=%.3fs", gemini_time)
+    if response and response.content:
+        return response.text
+    return ""
+
+
+async def astream_refined_answer(content: str):
+    """
+    Streams the refined answer of the retrieved question-answer pair from Gemini
+
+    Parameters
+    ----------
+    content: str
+        The retrieved question-answer pair
+
+    Returns
+    -------
+    AsyncIterator[str]
+        The text chunks of the refined answer
+
+    """
+
+
+    messages = [
+        ("system", system_message_content),
+        ("human", content)
+        ]
+    chunks = 0
+    gemini_start_time = time.time()
+    gemini_start = time.perf_counter()
+    try:
+        logger.info("Sending streaming request to Gemini LLM")
+        async for chunk in get_gemini_llm().astream(messages):
+            if chunk.text:
+                chunks += 1
+                yield chunk.text
+    except Exception as e:
+        observe_stage("llm_refinement", time.perf_counter() - gemini_start, error=True)
+        record_span("llm_refinement", gemini_start_time, time.perf_counter() - gemini_start, error=f"{type(e).__name__}: {e}", streamed=True, chunks=chunks)
+        raise
+    observe_stage("llm_refinement", time.perf_counter() - gemini_start)
+    record_span("llm_refinement", gemini_start_time, time.perf_counter() - gemini_start, streamed=True, chunks=chunks)
+
+
+def needs_query_embedding(query: str, mode: str | None = None)-> bool:
+    """
+    Checks whether retrieving the query will call the embeddings model
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "dense", "lexical", or "hybrid". Defaults to RETRIEVAL_MODE
+
+    Returns
+    -------
+    bool
+        False when the question index or a confident lexical search answers the query
+
+    """
+
+
+    mode = mode or retrieval_mode
+    if(query == "" or mode == "lexical"):
+        return False
+    if(question_index_enabled == True and question_index.lookup(query) is not None):
+        return False
+    if(mode == "hybrid" and lexical_index.is_confident(lexical_index.search(query, k=hybrid_k))):
+        return False
+    return True
+
+
+async def aresolve_document(query: str, query_embedding: list | None = None)-> dict:
+    """
+    Validates the query and retrieves the question-answer pair used to answer it
 
     Parameters
     ----------
     query: str
         The query sent by the user
 
+    query_embedding: list | None
+        The embedding of the query when it was already computed in bulk
+
     Returns
     -------
     dict
-        The refined answer, source, and message status.
-        
+        The retrieved document and its source, or the failed message status
+
     """
 
-    
-    logger.info("Starting Answer generation")
-    answer_generation = time.perf_counter()
+
     if(query == ""):
         logger.warning("Empty query received")
         return {
@@ -110,7 +376,20 @@ def refine_answer(query: str)-> dict:
         "message": "Please provide a question."
         }
     
-    retrieved_text = retrieve_similar_docs(query)
+    with span("retrieval", mode=retrieval_mode):
+        try:
+            retrieved_text = await retrieval_flight.do(
+                f"{retrieval_mode}:{normalize_query(query)}",
+                lambda: aretrieve_similar_docs(query, query_embedding=query_embedding)
+                )
+        except asyncio.TimeoutError:
+            logger.error("Retrieval timed out while waiting for an identical in-flight query")
+            retrieved_text = "Connection-Retrieval timed out"
+        if(isinstance(retrieved_text, str)):
+            set_attribute("result", retrieved_text.split("-")[0])
+        else:
+            set_attribute("retrieval_method", retrieved_text[0]["retrieval_method"])
+            set_attribute("similarity_score", float(retrieved_text[0]["similarity_score"]))
     if(retrieved_text == "No similar docs."):
         logger.warning("No similar documents found in the Vector DB")
         return {
@@ -118,6 +397,13 @@ def refine_answer(query: str)-> dict:
         "status_code": 404,
         "message": "There is no available information on the question."
         }
+    if(retrieved_text == "Low similarity."):
+        logger.warning("Retrieved document is below the similarity threshold")
+        return {
+        "success": False,
+        "status_code": 404,
+        "message": "There is no available information on the question."
+        }
     if(isinstance(retrieved_text, str)):
         if "OpenAIAPI" in retrieved_text:
             logger.error("OpenAI API error during embedding generation")
@@ -155,58 +441,360 @@ def refine_answer(query: str)-> dict:
             "message": "We are unable to provide an answer at the moment. Connection issue. Please try again."
             }
 
-    system_message_content = """
-        <role>
-        You are a Text Assistant.
-        </role>
-        <task>
-        Your task is to extract the answer ONLY from the given text and edit the answer as per the following instructions while preserving its exact structural identity.
-        </task>
+    doc = retrieved_text[0]
+    return {
+    "success": True,
+    "doc": doc,
+    "source": doc["file_name"] + " Page: " + str(doc["page_number"])
+    }
 
-        <instructions>
-        1. Only the answer from the given text is to be edited for output and not the question.
-        2. Fix spelling mistakes and mathematical equations only.
-        3. Remove non-text noise found exclusively at the absolute end of the input.
-        4. Do not add extra blank lines between bullet points.
-        5. Do not add extra commas or semicolons where they are not present in the answer.
-        6. Combine split elements ONLY if they were accidentally broken mid-sentence.
 
-        PRESERVATION RULES (DO NOT MODIFY):
-        1. Word Choice: Never add, swap, or delete existing words.
-        2. Paragraphs: Keep existing boundaries. Do not merge or split paragraphs.
-        3. Sentences: Keep existing boundaries. Do not break or arbitrarily merge sentences.
-        4. Punctuation: Retain all existing commas and semicolons exactly where they are.
+def lookup_answer(doc: dict, mode: str | None = None)-> str | None:
+    """
+    Returns the answer refined at ingestion or cached from an earlier request, refreshing stale cache entries in the background
 
-        OUTPUT FORMAT:
-        Output only the finalized and edited answer in text. Do not provide introductions, explanations, the question, or meta-commentary.
-        If zero changes are required, output the original answer in the text exactly as it is.
-        </instructions>
-        """
-    
-    source = retrieved_text[0]["file_name"] + " Page: " + str(retrieved_text[0]["page_number"]) 
-    messages = [
-        ("system", system_message_content),
-        ("human", retrieved_text[0]["content"])
-        ]
-    
-    try:
-        logger.info("Sending request to Gemini LLM")
-        gemini_start = time.perf_counter()
-        response = gemini_flash_llm.invoke(messages)
-        gemini_time = time.perf_counter() - gemini_start
-        logger.info("Gemini execution completed successfully | Time=%.3fs", gemini_time)
+    Parameters
+    ----------
+    doc: dict
+        The retrieved document
+
+    mode: str | None
+        "live" or "precomputed". Defaults to ANSWER_MODE
+
+    Returns
+    -------
+    str | None
+        The refined answer, or None if Gemini has to be called
+
+    """
+
+
+    if((mode or answer_mode) == "precomputed" and doc.get("refined_answer")):
+        logger.info("Answer served from ingestion refinement")
+        set_attribute("answer_source", "precomputed")
+        return doc["refined_answer"]
+
+    cache_key = answer_cache_key(doc, prompt_version)
+    cached_answer = answer_cache.get(cache_key)
+    if cached_answer is None:
+        set_attribute("answer_source", "llm")
+        return None
+    set_attribute("answer_source", "stale_cache" if cached_answer["stale"] else "cache")
+    if cached_answer["stale"]:
+        answer_cache.refresh(cache_key, doc["file_name"], lambda: generate_refined_answer(doc["content"]))
+    logger.info("Answer served from cache | Stale = %s", cached_answer["stale"])
+    return cached_answer["answer"]
+
+
+async def aanswer_document(resolved: dict, mode: str | None = None, answer_generation: float | None = None)-> dict:
+    """
+    Answers from the retrieved question-answer pair, calling Gemini only when no precomputed or cached answer exists
+
+    Parameters
+    ----------
+    resolved: dict
+        The retrieved document and source returned by aresolve_document
+
+    mode: str | None
+        "live" or "precomputed". Defaults to ANSWER_MODE
+
+    answer_generation: float | None
+        The perf_counter value at which answering the query started
+
+    Returns
+    -------
+    dict
+        The refined answer, source, and message status.
+
+    """
+
+
+    answer_generation = answer_generation or time.perf_counter()
+    doc, source = resolved["doc"], resolved["source"]
+    answer = lookup_answer(doc, mode)
+    if answer is not None:
         total_time = time.perf_counter() - answer_generation
         logger.info("Answer Generation completed successfully | Total Time = %.3fs", total_time)
-        if response and response.content:
-            return {
-            "success": True,
-            "answer": response.text,
-            "source": source
-            }
-    except Exception as e:
+        return {
+        "success": True,
+        "answer": answer,
+        "source": source
+        }
+
+    try:
+        cache_key = answer_cache_key(doc, prompt_version)
+        answer = await refinement_flight.do(cache_key, lambda: agenerate_refined_answer(doc["content"]))
+    except Exception:
         logger.exception("Gemini API request failed")
         return {
             "success": False,
             "status_code": 503,
             "message": "We are unable to provide an answer at the moment. There was an error in the Google API."
             }
+    if not answer:
+        logger.error("Gemini returned an empty answer")
+        return {
+            "success": False,
+            "status_code": 503,
+            "message": "We are unable to provide an answer at the moment. There was an error in the Google API."
+            }
+    answer_cache.set(cache_key, answer, doc["file_name"])
+    total_time = time.perf_counter() - answer_generation
+    logger.info("Answer Generation completed successfully | Total Time = %.3fs", total_time)
+    return {
+    "success": True,
+    "answer": answer,
+    "source": source
+    }
+
+
+async def arefine_answer(query: str, mode: str | None = None)-> dict:
+    """
+    Refines the answer retrieved from the Vector Database and generates the final answer asynchronously
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "live" to refine with Gemini, or "precomputed" to serve the answer refined at ingestion. Defaults to ANSWER_MODE
+
+    Returns
+    -------
+    dict
+        The refined answer, source, and message status.
+        
+    """
+
+    
+    logger.info("Starting Answer generation")
+    answer_generation = time.perf_counter()
+    resolved = await aresolve_document(query)
+    if not resolved["success"]:
+        return resolved
+
+    return await aanswer_document(resolved, mode, answer_generation)
+
+
+async def arefine_answer_stream(query: str, mode: str | None = None):
+    """
+    Streams the answer to the query, sending the source right after retrieval and then the refined answer as it is generated
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "live" or "precomputed". Defaults to ANSWER_MODE
+
+    Returns
+    -------
+    AsyncIterator[dict]
+        The "source", "token", "done", and "error" events with their data
+
+    """
+
+
+    logger.info("Starting streamed Answer generation")
+    answer_generation = time.perf_counter()
+    resolved = await aresolve_document(query)
+    if not resolved["success"]:
+        yield {"event": "error", "data": {"status_code": resolved["status_code"], "message": resolved["message"]}}
+        return
+
+    doc = resolved["doc"]
+    yield {"event": "source", "data": {"source": resolved["source"]}}
+    answer = lookup_answer(doc, mode)
+    if answer is not None:
+        yield {"event": "token", "data": {"text": answer}}
+        yield {"event": "done", "data": {"answer": answer}}
+        return
+
+    #Sharing one Gemini stream between identical concurrent refinements, streamed or not
+    cache_key = answer_cache_key(doc, prompt_version)
+    chunks = []
+    try:
+        async for text in refinement_flight.stream(cache_key, lambda: astream_refined_answer(doc["content"])):
+            chunks.append(text)
+            yield {"event": "token", "data": {"text": text}}
+    except Exception:
+        logger.exception("Gemini API streaming request failed")
+        yield {"event": "error", "data": {"status_code": 503, "message": "We are unable to provide an answer at the moment. There was an error in the Google API."}}
+        return
+
+    answer = "".join(chunks)
+    if not answer:
+        logger.error("Gemini returned an empty answer")
+        yield {"event": "error", "data": {"status_code": 503, "message": "We are unable to provide an answer at the moment. There was an error in the Google API."}}
+        return
+    answer_cache.set(cache_key, answer, doc["file_name"])
+    total_time = time.perf_counter() - answer_generation
+    logger.info("Streamed Answer Generation completed successfully | Total Time = %.3fs", total_time)
+    yield {"event": "done", "data": {"answer": answer}}
+
+
+async def arefine_answers_batch(queries: list, mode: str | None = None):
+    """
+    Answers many queries with one bulk embedding call, concurrent retrieval, and bounded concurrent refinement
+
+    Parameters
+    ----------
+    queries: list
+        The queries sent by the user
+
+    mode: str | None
+        "live" or "precomputed". Defaults to ANSWER_MODE
+
+    Returns
+    -------
+    AsyncIterator[dict]
+        The result of every query with its index, in order of completion
+
+    """
+
+
+    batch_start = time.perf_counter()
+    logger.info("Starting batch Answer generation | Queries = %d", len(queries))
+    query_embeddings = {}
+    queries_to_embed = list(dict.fromkeys(query for query in queries if needs_query_embedding(query)))
+    if queries_to_embed:
+        try:
+            vectors = await get_embeddings().aembed_queries(queries_to_embed)
+            query_embeddings = dict(zip(queries_to_embed, vectors))
+            logger.info("Bulk OpenAI embedding generated | Queries = %d", len(queries_to_embed))
+        except Exception:
+            logger.exception("Bulk OpenAI embedding failed, embedding queries individually")
+
+    refinement_semaphore = asyncio.Semaphore(batch_refinement_concurrency)
+
+    async def answer_query(index: int, query: str)-> dict:
+        answer_generation = time.perf_counter()
+        resolved = await aresolve_document(query, query_embedding=query_embeddings.get(query))
+        if resolved["success"]:
+            async with refinement_semaphore:
+                resolved = await aanswer_document(resolved, mode, answer_generation)
+        return {"index": index, "query": query, **resolved}
+
+    tasks = [asyncio.ensure_future(answer_query(index, query)) for index, query in enumerate(queries)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        for task in tasks:
+            task.cancel()
+    batch_time = time.perf_counter() - batch_start
+    logger.info("Batch Answer generation completed | Queries = %d | Total Time = %.3fs", len(queries), batch_time)
+
+
+def dense_search(query: str, k: int = 1)-> list:
+    """
+    Retrieves the question-answer pairs with the highest embedding similarity to the query from the configured vector store
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    k: int
+        The number of documents to retrieve
+
+    Returns
+    -------
+    list
+        The documents with the highest similarity, or an error string
+
+    """
+
+
+    return run_sync(adense_search(query, k=k))
+
+
+def retrieve_similar_docs(query: str, mode: str | None = None)-> list:
+    """
+    Retrieves the question-answer pair with the highest similarity to the query sent by the user
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "dense", "lexical", or "hybrid". Defaults to RETRIEVAL_MODE
+
+    Returns
+    -------
+    list
+        The documents with the highest similarity, or an error string
+
+    """
+
+
+    return run_sync(aretrieve_similar_docs(query, mode=mode))
+
+
+def generate_refined_answer(content: str)-> str:
+    """
+    Sends the retrieved question-answer pair to Gemini and returns the refined answer
+
+    Parameters
+    ----------
+    content: str
+        The retrieved question-answer pair
+
+    Returns
+    -------
+    str
+        The refined answer, or an empty string if Gemini returned no content
+
+    """
+
+
+    return run_sync(agenerate_refined_answer(content))
+
+
+def refine_answer(query: str, mode: str | None = None)-> dict:
+    """
+    Refines the answer retrieved from the Vector Database and generates the final answer
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "live" to refine with Gemini, or "precomputed" to serve the answer refined at ingestion. Defaults to ANSWER_MODE
+
+    Returns
+    -------
+    dict
+        The refined answer, source, and message status.
+
+    """
+
+
+    return run_sync(arefine_answer(query, mode=mode))
+
+
+def refine_answer_stream(query: str, mode: str | None = None):
+    """
+    Streams the answer to the query from synchronous code
+
+    Parameters
+    ----------
+    query: str
+        The query sent by the user
+
+    mode: str | None
+        "live" or "precomputed". Defaults to ANSWER_MODE
+
+    Returns
+    -------
+    Iterator[dict]
+        The "source", "token", "done", and "error" events with their data
+
+    """
+
+
+    return iterate_sync(arefine_answer_stream(query, mode=mode))
@@ -0,0 +1,97 @@
+"""
+The module comprises of the similarity score gate that rejects low-confidence dense retrievals before answer refinement.
+"""
+
+import os
+import json
+import logging
+
+logger = logging.getLogger("faq-qa-bot")
+score_thresholds_path = os.getenv("SCORE_THRESHOLDS_PATH", "./retrieval_thresholds.json")
+_thresholds = None
+
+
+def load_thresholds()-> dict:
+    """
+    Loads the calibrated thresholds of every index
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    dict
+        The min_score and min_margin of each index, keyed by index name
+
+    """
+
+
+    global _thresholds
+    if os.path.exists(score_thresholds_path):
+        with open(score_thresholds_path, "r", encoding="utf-8") as thresholds_file:
+            _thresholds = json.load(thresholds_file)
+    else:
+        _thresholds = {}
+    return _thresholds
+
+
+def get_thresholds(index_key: str)-> dict:
+    """
+    Returns the thresholds of an index, with environment variables taking precedence over the calibrated file
+
+    Parameters
+    ----------
+    index_key: str
+        The Pinecone index name, or "local" for the local vector index
+
+    Returns
+    -------
+    dict
+        The min_score and min_margin, each None when the check is disabled
+
+    """
+
+
+    if _thresholds is None:
+        load_thresholds()
+    calibrated = _thresholds.get(index_key, {})
+    min_score = os.getenv("SCORE_GATE_MIN_SCORE") or calibrated.get("min_score")
+    min_margin = os.getenv("SCORE_GATE_MIN_MARGIN") or calibrated.get("min_margin")
+    return {
+        "min_score": float(min_score) if min_score is not None else None,
+        "min_margin": float(min_margin) if min_margin else None
+    }
+
+
+def passes_score_gate(docs: list, index_key: str)-> bool:
+    """
+    Checks that the top dense result is similar enough to the query, and far enough ahead of the runner-up when a margin is set
+
+    Parameters
+    ----------
+    docs: list
+        The dense results ordered by decreasing similarity
+
+    index_key: str
+        The Pinecone index name, or "local" for the local vector index
+
+    Returns
+    -------
+    bool
+        False when the retrieval should be answered with "no information"
+
+    """
+
+
+    thresholds = get_thresholds(index_key)
+    top_score = docs[0]["similarity_score"]
+    if thresholds["min_score"] is not None and top_score < thresholds["min_score"]:
+        logger.info("Score gate rejected retrieval | Score = %.3f | Threshold = %.3f", top_score, thresholds["min_score"])
+        return False
+    if thresholds["min_margin"] is not None and len(docs) > 1:
+        margin = top_score - docs[1]["similarity_score"]
+        if margin < thresholds["min_margin"]:
+            logger.info("Score gate rejected retrieval | Margin = %.3f | Threshold = %.3f", margin, thresholds["min_margin"])
+            return False
+    return True
@@ -0,0 +1,146 @@
+"""
+The module comprises of the persistent content-addressed cache of the GPT-4.1 table descriptions.
+"""
+
+import os
+import sys
+import json
+import base64
+import hashlib
+import logging
+import binascii
+from core.shared_cache import SharedCache, shared_cache_path
+
+logger = logging.getLogger("faq-qa-bot")
+table_description_cache_max_entries = int(os.getenv("TABLE_DESCRIPTION_CACHE_MAX_ENTRIES", 20000))
+table_description_cache = SharedCache(shared_cache_path, "table_descriptions", table_description_cache_max_entries) if shared_cache_path else None
+
+
+def table_description_key(image: str, prompt: str, model: str)-> str:
+    """
+    Returns the cache key of a table description, so identical tables in any document share it until the prompt or model changes
+
+    Parameters
+    ----------
+    image: str
+        The base64 encoded table image
+
+    prompt: str
+        The table description prompt
+
+    model: str
+        The model describing the table
+
+    Returns
+    -------
+    str
+        The SHA-256 digests of the decoded image and the prompt, and the model name
+
+    """
+
+
+    try:
+        image_bytes = base64.b64decode(image, validate=False)
+    except (binascii.Error, ValueError):
+        image_bytes = image.encode("utf-8")
+    image_hash = hashlib.sha256(image_bytes).hexdigest()
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+    return f"{image_hash}:{prompt_hash}:{model}"
+
+
+def get_cached_description(key: str)-> str | None:
+    """
+    Returns a cached table description
+
+    Parameters
+    ----------
+    key: str
+        The cache key
+
+    Returns
+    -------
+    str | None
+        The table description, or None if it is not cached or the cache is disabled
+
+    """
+
+
+    if table_description_cache is None:
+        return None
+    entry = table_description_cache.get(key)
+    return entry["value"] if entry is not None else None
+
+
+def set_cached_description(key: str, description: str)-> None:
+    """
+    Stores a table description
+
+    Parameters
+    ----------
+    key: str
+        The cache key
+
+    description: str
+        The table description
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    if table_description_cache is not None:
+        table_description_cache.set(key, description)
+
+
+def warm_from_parsed_outputs(directory: str = "./json_parsedoutputs")-> dict:
+    """
+    Describes every table image of the parsed PDFs that is not cached yet
+
+    Parameters
+    ----------
+    directory: str
+        The directory of the parsed JSON files
+
+    Returns
+    -------
+    dict
+        The number of tables, the tables that were already cached, and the newly described and failed tables
+
+    """
+
+
+    from services.doc_tools import get_table_descriptions, table_description_prompt, table_description_model
+
+    images = []
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, file_name), "r", encoding="utf-8") as file:
+            elements = json.load(file).get("elements", [])
+        images.extend(element["base64_encoding"] for element in elements if element.get("base64_encoding"))
+    unique_images = list(dict.fromkeys(images))
+    missing = [image for image in unique_images if get_cached_description(table_description_key(image, table_description_prompt, table_description_model)) is None]
+    descriptions = get_table_descriptions(missing)
+    failed = sum(1 for description in descriptions if description is None)
+    logger.info("Table description cache warmed | Tables = %d | Cached = %d | Described = %d | Failed = %d", len(unique_images), len(unique_images) - len(missing), len(missing) - failed, failed)
+    return {
+        "tables": len(unique_images),
+        "cached": len(unique_images) - len(missing),
+        "described": len(missing) - failed,
+        "failed": failed
+    }
+
+
+if __name__ == "__main__":
+    from core.logging_config import setup_logging
+
+    setup_logging()
+    if sys.argv[1:2] != ["warm"] or len(sys.argv) > 3:
+        print("Usage: python -m services.table_description_cache warm [json_parsedoutputs directory]")
+        sys.exit(1)
+    if table_description_cache is None:
+        print("The table description cache is disabled because SHARED_CACHE_PATH is empty")
+        sys.exit(1)
+    print(warm_from_parsed_outputs(*sys.argv[2:]))
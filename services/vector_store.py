@@ -0,0 +1,400 @@
+"""
+The module comprises of the process-wide vector store client shared by the API, Gradio callbacks, and evaluation scripts.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+import time
+from langchain_openai import OpenAIEmbeddings
+from langchain_pinecone import PineconeVectorStore
+from pinecone import Pinecone
+from dotenv import load_dotenv, find_dotenv
+from core.pipeline_loop import run_sync
+from core.readiness import set_ready
+from core.shared_cache import SharedCache, shared_cache_path
+from services.embedding_cache import CachedQueryEmbeddings
+from services.ingestion_catalog import ingestion_catalog
+from services.local_index import LocalVectorIndex, local_index_dir, local_index_ann, local_index_ann_min_size
+
+_ = load_dotenv(find_dotenv())
+openai_api_key = os.getenv("OPENAI_API_KEY")
+pinecone_api_key = os.getenv("PINECONE_API_KEY")
+index_name = "faqsampleindexjuly2026"
+vector_backend = os.getenv("VECTOR_BACKEND", "pinecone")
+pool_threads = int(os.getenv("PINECONE_POOL_THREADS", 4))
+connection_pool_maxsize = int(os.getenv("PINECONE_CONNECTION_POOL_MAXSIZE", 16))
+health_check_interval = float(os.getenv("VECTOR_STORE_HEALTH_CHECK_INTERVAL", 60))
+embedding_cache_max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 10000))
+embedding_cache_ttl = float(os.getenv("EMBEDDING_CACHE_TTL", 0)) or None
+embedding_shared_cache_max_entries = int(os.getenv("EMBEDDING_SHARED_CACHE_MAX_ENTRIES", 100000))
+logger = logging.getLogger("faq-qa-bot")
+
+_client_lock = threading.Lock()
+_embeddings_lock = threading.Lock()
+_embeddings = None
+_local_index = None
+_index = None
+_vectorstore = None
+_async_session_task = None
+_health_stop_event = threading.Event()
+_health_thread = None
+_health_status = {"healthy": False, "last_check": None, "last_error": None}
+
+
+def get_embeddings()-> CachedQueryEmbeddings:
+    """
+    Returns the process-wide cached query embeddings, creating the OpenAI embeddings client on first use
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    CachedQueryEmbeddings
+        The shared embeddings with the query embedding cache in front of OpenAI
+
+    """
+
+
+    global _embeddings
+    if _embeddings is not None:
+        return _embeddings
+
+    with _embeddings_lock:
+        if _embeddings is None:
+            _embeddings = CachedQueryEmbeddings(
+                OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=openai_api_key),
+                max_entries=embedding_cache_max_entries,
+                ttl=embedding_cache_ttl,
+                shared_cache=SharedCache(shared_cache_path, "query_embeddings", embedding_shared_cache_max_entries, ttl=embedding_cache_ttl) if shared_cache_path else None
+                )
+    return _embeddings
+
+
+def preload_local_index()-> LocalVectorIndex:
+    """
+    Loads the local vector index without creating the embeddings client, so it can be shared copy-on-write by forked workers
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    LocalVectorIndex
+        The loaded local index
+
+    """
+
+
+    global _local_index
+    if _local_index is None:
+        _local_index = LocalVectorIndex(local_index_dir, None, ann=local_index_ann, ann_min_size=local_index_ann_min_size, generation=ingestion_catalog.generation)
+    _local_index.load()
+    return _local_index
+
+
+def get_vectorstore()-> PineconeVectorStore | LocalVectorIndex:
+    """
+    Returns the process-wide vector store of the configured backend, creating it on first use
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    PineconeVectorStore | LocalVectorIndex
+        The shared vector store, backed by a pooled keep-alive Pinecone index connection or by the local index
+
+    """
+
+
+    global _index, _vectorstore
+    if _vectorstore is not None:
+        return _vectorstore
+
+    with _client_lock:
+        if _vectorstore is None and vector_backend == "local":
+            _vectorstore = preload_local_index()
+            _vectorstore.embeddings = get_embeddings()
+        if _vectorstore is None:
+            client_start = time.perf_counter()
+            pinecone_client = Pinecone(api_key=pinecone_api_key, pool_threads=pool_threads)
+            _index = pinecone_client.Index(index_name, pool_threads=pool_threads, connection_pool_maxsize=connection_pool_maxsize)
+            _vectorstore = PineconeVectorStore(index=_index, embedding=get_embeddings())
+            client_time = time.perf_counter() - client_start
+            logger.info("Pinecone vector store client created | Index = %s | Time = %.3fs", index_name, client_time)
+    return _vectorstore
+
+
+async def aget_vectorstore()-> PineconeVectorStore | LocalVectorIndex:
+    """
+    Returns the shared vector store with its async Pinecone session held open on the pipeline loop
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    PineconeVectorStore | LocalVectorIndex
+        The shared vector store ready for async searches
+
+    """
+
+
+    global _async_session_task
+    vectorstore = get_vectorstore()
+    if isinstance(vectorstore, PineconeVectorStore):
+        if _async_session_task is None:
+            _async_session_task = asyncio.ensure_future(vectorstore.__aenter__())
+        try:
+            await asyncio.shield(_async_session_task)
+        except Exception:
+            _async_session_task = None
+            raise
+    return vectorstore
+
+
+async def aclose_vectorstore()-> None:
+    """
+    Closes the async Pinecone session of the shared vector store
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _async_session_task
+    vectorstore = _vectorstore
+    if isinstance(vectorstore, PineconeVectorStore) and _async_session_task is not None:
+        _async_session_task = None
+        await vectorstore.aclose()
+
+
+def reset_vectorstore()-> None:
+    """
+    Closes the async Pinecone session and drops the shared vector store so the next call to get_vectorstore creates a fresh client
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _index, _vectorstore, _async_session_task
+    #Closing the async session opened on the pipeline loop before dropping it, so its connection pool is not leaked
+    if _async_session_task is not None:
+        try:
+            run_sync(aclose_vectorstore())
+        except Exception:
+            logger.exception("Closing the async Pinecone session failed")
+    with _client_lock:
+        _index = None
+        _vectorstore = None
+        _async_session_task = None
+
+
+def check_health()-> bool:
+    """
+    Checks that the Pinecone index is reachable through the shared client, or that the local index loads
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        The health of the vector store connection
+
+    """
+
+
+    try:
+        vectorstore = get_vectorstore()
+        if isinstance(vectorstore, LocalVectorIndex):
+            vectorstore.load()
+        else:
+            _index.describe_index_stats()
+        _health_status["healthy"] = True
+        _health_status["last_error"] = None
+    except Exception as e:
+        logger.exception("Pinecone health check failed")
+        _health_status["healthy"] = False
+        _health_status["last_error"] = str(e)
+        reset_vectorstore()
+    _health_status["last_check"] = time.time()
+    set_ready("vector_store", _health_status["healthy"], _health_status["last_error"])
+    return _health_status["healthy"]
+
+
+def get_health()-> dict:
+    """
+    Returns the result of the latest vector store health check
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    dict
+        The health state, time of the last check, and last error
+
+    """
+
+
+    return dict(_health_status)
+
+
+def warm_up_vector_store()-> bool:
+    """
+    Creates the shared vector store client and opens its sync and async Pinecone connections, or loads the local index
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        The health of the vector store
+
+    """
+
+
+    healthy = check_health()
+    if healthy:
+        run_sync(aget_vectorstore())
+    return healthy
+
+
+def warm_up_embeddings()-> bool:
+    """
+    Creates the shared embeddings and opens the sync and async OpenAI connections
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        The state of the warm-up
+
+    """
+
+
+    embeddings = get_embeddings()
+    embeddings.embeddings.embed_query("warm-up")
+    run_sync(embeddings.embeddings.aembed_query("warm-up"))
+    return True
+
+
+def warm_up()-> bool:
+    """
+    Creates the shared clients and opens the sync and async Pinecone and OpenAI connections before traffic arrives
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        The state of the warm-up
+
+    """
+
+
+    warm_up_start = time.perf_counter()
+    logger.info("Starting vector store warm-up")
+    try:
+        healthy = warm_up_vector_store()
+        healthy = warm_up_embeddings() and healthy
+    except Exception:
+        logger.exception("OpenAI embedding and async client warm-up failed")
+        healthy = False
+    warm_up_time = time.perf_counter() - warm_up_start
+    logger.info("Vector store warm-up completed | Healthy = %s | Time = %.3fs", healthy, warm_up_time)
+    return healthy
+
+
+def _run_health_checks()-> None:
+    """
+    Runs the periodic health checks until stop_health_checks is called
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    while not _health_stop_event.wait(health_check_interval):
+        check_health()
+
+
+def start_health_checks()-> None:
+    """
+    Starts the background thread that periodically checks the vector store connection
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _health_thread
+    if _health_thread is not None and _health_thread.is_alive():
+        return
+    _health_stop_event.clear()
+    _health_thread = threading.Thread(target=_run_health_checks, name="vector-store-health", daemon=True)
+    _health_thread.start()
+
+
+def stop_health_checks()-> None:
+    """
+    Stops the background health check thread
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+
+    """
+
+
+    global _health_thread
+    _health_stop_event.set()
+    if _health_thread is not None:
+        _health_thread.join(timeout=5)
+        _health_thread = None
@@ -0,0 +1,64 @@
+"""
+The module comprises of the tests of the typo-tolerant question index.
+"""
+
+import pytest
+import services.question_index as question_index_module
+from services.question_index import QuestionIndex, token_edit_distance
+
+edition_questions = [
+    "Q20. If I have Datacenter edition with Software Assurance when Windows Server 2012 is released, which edition will I be entitled to receive?",
+    "Q21. If I have Enterprise edition with Software Assurance when Windows Server 2012 is released, which edition will I be entitled to receive?",
+    "Q23. If I have Foundation edition with Software Assurance when Windows Server 2012 is released, which edition will I be entitled to receive?",
+    "Q26. If I have Essentials edition with Software Assurance when Windows Server 2012 is released, which edition will I be entitled to receive?"
+]
+
+
+@pytest.fixture
+def edition_index(monkeypatch):
+    """
+    Returns a question index over questions that differ only by their edition name
+
+    """
+
+
+    entries = [
+        {"question": question, "answer": "Answer", "content": f"{question}\nAnswer", "file_name": "faq.pdf", "page_number": 1, "refined_answer": ""}
+        for question in edition_questions
+    ]
+    monkeypatch.setattr(question_index_module, "load_qa_entries", lambda: entries)
+    monkeypatch.setattr(question_index_module.ingestion_catalog, "generation", lambda: 0)
+    return QuestionIndex(fuzzy_cutoff=0.92)
+
+
+def test_exact_question_matches(edition_index):
+    match = edition_index.lookup(edition_questions[0])
+    assert match["content"].startswith("Q20.")
+    assert match["similarity_score"] == 1.0
+
+
+def test_typo_in_edition_name_matches(edition_index):
+    match = edition_index.lookup("If I have Datacentre edition with Software Asurance when Windows Server 2012 is released, which edition will I be entitled to receive?")
+    assert match["content"].startswith("Q20.")
+    assert 0.92 <= match["similarity_score"] < 1.0
+
+
+def test_other_edition_name_does_not_match(edition_index):
+    assert edition_index.lookup("If I have Standard edition with Software Assurance when Windows Server 2012 is released, which edition will I be entitled to receive?") is None
+    assert edition_index.lookup("If I have Foundations edition with Software Assurance when Windows Server 2016 is released, which edition will I be entitled to receive?") is None
+
+
+def test_ambiguous_typo_does_not_match(monkeypatch):
+    entries = [
+        {"question": question, "answer": "Answer", "content": question, "file_name": "faq.pdf", "page_number": 1, "refined_answer": ""}
+        for question in ("how is the server priced per processor", "how is the server prized per processor")
+    ]
+    monkeypatch.setattr(question_index_module, "load_qa_entries", lambda: entries)
+    monkeypatch.setattr(question_index_module.ingestion_catalog, "generation", lambda: 0)
+    assert QuestionIndex(fuzzy_cutoff=0.92).lookup("how is the server prised per processor") is None
+
+
+def test_substituted_word_is_not_a_typo():
+    assert token_edit_distance(["foundation", "edition"], ["datacenter", "edition"], 10) is None
+    assert token_edit_distance(["2012", "r2"], ["2016", "r2"], 10) is None
+    assert token_edit_distance(["datacentre", "edition"], ["datacenter", "edition"], 10) == 2